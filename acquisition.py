@@ -0,0 +1,69 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Oversampled and filtered acquisition of the analog inputs
+"""
+
+from machine import ADC, Pin
+from micropython import const
+from array import array
+
+FRACTION_BITS = const(8)   # fixed point fraction of the filter state
+
+
+class Channel:
+    # reads a burst of samples, takes the median to reject outliers and smooths the medians with an IIR filter
+    # new = old + (median - old) / 2**iir_shift, iir_shift = 0 switches smoothing off
+    def __init__(self, pin, burst=8, iir_shift=2):
+        self.adc = ADC(Pin(pin))
+        self.burst = max(1, burst)
+        self.samples = array('H', range(self.burst))   # preallocated, overwritten on every read
+        self.iir_shift = iir_shift
+        self.state = -1   # filter state in fixed point, -1 until the first read
+
+    def read(self):   # returns the filtered value, 0 - 65535 like read_u16
+        s = self.samples
+        n = self.burst
+        read_u16 = self.adc.read_u16
+        for i in range(0, n):
+            s[i] = read_u16()
+        for i in range(1, n):   # insertion sort, bursts are short
+            v = s[i]
+            j = i - 1
+            while j >= 0 and s[j] > v:
+                s[j + 1] = s[j]
+                j -= 1
+            s[j + 1] = v
+        median = s[n >> 1] << FRACTION_BITS
+        if self.state < 0:
+            self.state = median   # start without settling time
+        else:
+            self.state += (median - self.state) >> self.iir_shift
+        return (self.state + (1 << (FRACTION_BITS - 1))) >> FRACTION_BITS
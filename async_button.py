@@ -35,6 +35,13 @@ class Pushbutton:
         self._lf = None  # long pressed function
         self.sense = pin.value()  # Convert from electrical to logical value
         self.state = self.rawstate()  # Initial state
+        self._t_change = time.ticks_ms()  # time of the last debounced change
+        self._clicks = 0
+        self._lpr = False  # long press ran
+        self._sup = False  # release func suppressed after long or double press
+        self._bf = None  # heartbeat function
+        self._pf = None  # park function
+        self._ba = ()
         loop = asyncio.get_event_loop()
         loop.create_task(self.buttoncheck())  # Thread runs forever
 
@@ -54,6 +61,12 @@ class Pushbutton:
         self._lf = func
         self._la = args
 
+    # func is called whenever the check loop runs, park before it waits for a pin edge without a time limit
+    def heartbeat_func(self, func, park=None, args=()):
+        self._bf = func
+        self._pf = park
+        self._ba = args
+
     # Current non-debounced logical button state: True == pressed
     def rawstate(self):
         return bool(self.pin.value() ^ self.sense)
@@ -62,60 +75,87 @@ class Pushbutton:
     def __call__(self):
         return self.state
 
-    async def buttoncheck(self):
-        t_change = None
-        supp = False
-        clicks = 0
-        lpr = False  # long press ran
-        ####
-        # local functions for performance improvements
-        deb = self.debounce_ms
-        dcms = self.double_click_ms
-        lpms = self.long_press_ms
-        raw = self.rawstate
+    # One debounced step of the button logic, called every debounce_ms while the button needs attention
+    def _check(self):
         ticks_diff = time.ticks_diff
-        ticks_ms = time.ticks_ms
-        #
+        now = time.ticks_ms()
+        state = self.rawstate()
+        # print('buttoncheck ... {:2d}'.format(state))
+        if state is False and self.state is False and self._supp and \
+                ticks_diff(now, self._t_change) > self.double_click_ms and self._clicks > 0 and self._ff:
+            self._clicks = 0
+            launch(self._ff, self._fa)
+        elif state is True and self.state is True:
+            if self._clicks > 0 and ticks_diff(now, self._t_change) > self.double_click_ms:
+                # double click timeout
+                self._clicks = 0
+            if self._lf and self._lpr is False:  # check long press
+                if ticks_diff(now, self._t_change) >= self.long_press_ms:
+                    self._lpr = True
+                    self._clicks = 0
+                    if self._supp is True:
+                        self._sup = True
+                    launch(self._lf, self._la)
+        elif state != self.state:  # state changed
+            self._lpr = False
+            self.state = state
+            if state is True:  # Button pressed: launch pressed func
+                if ticks_diff(now, self._t_change) > self.double_click_ms:
+                    self._clicks = 0
+                if self._df:
+                    self._clicks += 1
+                if self._clicks == 2:  # double click
+                    self._clicks = 0
+                    if self._supp is True:
+                        self._sup = True
+                    launch(self._df, self._da)
+                elif self._tf:
+                    launch(self._tf, self._ta)
+            else:  # Button released. launch release func
+                if self._sup is True:
+                    self._sup = False
+                elif self._clicks and self._supp > 0:
+                    pass
+                elif self._ff:  # not after a long press with suppress
+                    launch(self._ff, self._fa)
+            self._t_change = now
+
+    async def buttoncheck(self):
         while True:
-            state = raw()
-            # print('buttoncheck ... {:2d}'.format(state))
-            if state is False and self.state is False and self._supp and \
-                    ticks_diff(ticks_ms(), t_change) > dcms and clicks > 0 and self._ff:
-                clicks = 0
-                launch(self._ff, self._fa)
-            elif state is True and self.state is True:
-                if clicks > 0 and ticks_diff(ticks_ms(), t_change) > dcms:
-                    # double click timeout
-                    clicks = 0
-                if self._lf and lpr is False:  # check long press
-                    if ticks_diff(ticks_ms(), t_change) >= lpms:
-                        lpr = True
-                        clicks = 0
-                        if self._supp is True:
-                            supp = True
-                        launch(self._lf, self._la)
-            elif state != self.state:  # state changed
-                lpr = False
-                self.state = state
-                if state is True:  # Button pressed: launch pressed func
-                    if ticks_diff(ticks_ms(), t_change) > dcms:
-                        clicks = 0
-                    if self._df:
-                        clicks += 1
-                    if clicks == 2:  # double click
-                        clicks = 0
-                        if self._supp is True:
-                            supp = True
-                        launch(self._df, self._da)
-                    elif self._tf:
-                        launch(self._tf, self._ta)
-                else:  # Button released. launch release func
-                    if supp is True:
-                        supp = False
-                    elif clicks and self._supp > 0:
-                        pass
-                    elif self._ff:  # not after a long press with suppress
-                        launch(self._ff, self._fa)
-                t_change = ticks_ms()
+            if self._bf:
+                self._bf(*self._ba)
+            self._check()
             # Ignore state changes until switch has settled
-            await asyncio.sleep_ms(deb)
+            await asyncio.sleep_ms(self.debounce_ms)
+
+
+class IrqPushbutton(Pushbutton):
+    # Same API and behaviour as Pushbutton, but the pin is only polled while a press is in progress.
+    # Edges on the pin wake the check loop through an interrupt, an idle button costs no wake-ups at all
+
+    def __init__(self, pin, suppress=False):
+        self._edge = asyncio.ThreadSafeFlag()
+        super().__init__(pin, suppress)
+        pin.irq(handler=self._irq, trigger=pin.IRQ_FALLING | pin.IRQ_RISING)
+
+    def _irq(self, pin):   # interrupt handler, bouncing contacts may call it several times
+        self._edge.set()
+
+    # True while the button is pressed or a suppressed release function is still due
+    def _active(self):
+        return self.state or self.rawstate() or (self._supp and self._clicks > 0 and self._ff is not None)
+
+    async def buttoncheck(self):
+        while True:
+            if self._pf:
+                self._pf(*self._ba)
+            await self._edge.wait()
+            if self._bf:
+                self._bf(*self._ba)
+            self._check()
+            while self._active():
+                await asyncio.sleep_ms(self.debounce_ms)
+                if self._bf:
+                    self._bf(*self._ba)
+                self._check()
+            await asyncio.sleep_ms(self.debounce_ms)   # ignore the bouncing of the release
@@ -0,0 +1,111 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Calibration of the trim sensors, maps raw trim values to the indicated percentage
+"""
+
+from micropython import const
+from array import array
+
+RAW_MIN = const(-100)   # range of raw trim values as calculated by the sensor reader
+RAW_MAX = const(100)
+MAX_POINTS = const(9)   # max number of calibration points per axis
+
+
+def setup_percentage(index, count):   # percentage the pointer shows for calibration point index of count
+    return 100 - 200 * index // (count - 1)
+
+
+def valid(points):   # raw values of the points, in the order captured, have to be strictly monotonic
+    if len(points) < 2:
+        return False
+    rising = points[1][0] > points[0][0]
+    for i in range(1, len(points)):
+        if points[i][0] == points[i - 1][0] or (points[i][0] > points[i - 1][0]) != rising:
+            return False
+    return True
+
+
+class Calibration:
+    # lookup table with the percentage for every raw value, built by piecewise linear interpolation between
+    # the points measured in setup. Integer arithmetic only, percentage() does not allocate
+    def __init__(self, positive=100, neutral=0, negative=-100):
+        self.table = array('b', bytes(RAW_MAX - RAW_MIN + 1))
+        self.raws = array('h', bytes(2 * MAX_POINTS))   # calibration points sorted by raw value
+        self.percents = array('b', bytes(MAX_POINTS))
+        self.count = 0
+        self.build(positive, neutral, negative)
+
+    def build(self, positive, neutral, negative):   # three point calibration, raw values for +100 %, 0 %, -100 %
+        self.build_points(((positive, 100), (neutral, 0), (negative, -100)))
+
+    def build_points(self, points):   # points are (raw, percentage), 2 to MAX_POINTS, any order
+        raws = self.raws
+        percents = self.percents
+        n = 0
+        for raw, percent in points[:MAX_POINTS]:   # insertion sort by raw value
+            i = n
+            while i > 0 and raws[i - 1] > raw:
+                raws[i] = raws[i - 1]
+                percents[i] = percents[i - 1]
+                i -= 1
+            raws[i] = raw
+            percents[i] = percent
+            n += 1
+        self.count = n
+        for raw in range(RAW_MIN, RAW_MAX + 1):
+            self.table[raw - RAW_MIN] = self.interpolate(raw)
+
+    def interpolate(self, raw):   # binary search for the segment, limited to the outermost points
+        raws = self.raws
+        percents = self.percents
+        lo = 0
+        hi = self.count - 1
+        if raw <= raws[lo]:
+            return percents[lo]
+        if raw >= raws[hi]:
+            return percents[hi]
+        while hi - lo > 1:   # raws[lo] < raw < raws[hi]
+            mid = (lo + hi) >> 1
+            if raws[mid] <= raw:
+                lo = mid
+            else:
+                hi = mid
+        span = raws[hi] - raws[lo]
+        num = percents[lo] * (raws[hi] - raw) + percents[hi] * (raw - raws[lo])
+        percent = (2 * abs(num) + span) // (2 * span)   # rounded
+        return percent if num >= 0 else -percent
+
+    def percentage(self, raw):
+        if raw <= RAW_MIN:
+            return self.table[0]
+        if raw >= RAW_MAX:
+            return self.table[RAW_MAX - RAW_MIN]
+        return self.table[raw - RAW_MIN]
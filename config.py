@@ -58,7 +58,7 @@ def save(values, config_file=None):
     except OSError:
         pass
 
-    with open(config_file, 'wb') as f:
+    with open(config_file, 'w') as f:
         f.write(json.dumps(values))
 
 
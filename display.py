@@ -35,6 +35,9 @@ from machine import SPI, Pin
 import framebuf
 import math
 import font8x8
+import ghosting
+import profiler
+from array import array
 
 # Connection of the display
 #   Display   Board name   Board number
@@ -59,14 +62,27 @@ SIZE_VOLT = 16
 SIZE_TRIANGLE = 30
 SIZE_TRIANGLE_POINTER = 12
 
+# Layouts of the static background
+LAYOUT_ELEVATOR = 0          # elevator scale only
+LAYOUT_ELEVATOR_RUDDER = 1   # elevator and rudder scale
+LAYOUT_SETUP_RUDDER = 2      # rudder scale only, used during setup of the rudder trim
+
+GLYPH_CACHE_SIZE = 24        # max number of rendered characters kept by Display.glyph
+VOLT_CHARS = 6               # max number of seven segment characters of the voltage readout
+FAST_BYTES = 240             # changes up to this size in bytes of the dirty window use the fast waveform
+PROBE_INDICATOR = profiler.probe('display.indicator')   # hot paths are timed inline, the decorators allocate
+PROBE_PREPARE = profiler.probe('display.prepare')
+PROBE_SEND = profiler.probe('display.send')
+
 # seven segment numbers for display
+seven_seg_chars = '0123456789+-.'   # characters available as seven segment sprites
 nums = ((1, 3, 4, 5, 6, 7), (6, 7), (1, 6, 2, 5, 3), (1, 6, 2, 7, 3), (4, 6, 2, 7), (1, 4, 2, 7, 3), (1, 4, 2, 7, 5, 3),
         (1, 6, 7), (1, 2, 3, 4, 5, 6, 7), (1, 4, 6, 2, 7, 3))
 
 
 # Default assignment: sck=Pin(10), mosi=Pin(11), miso=Pin(8)
 class Display:
-    def __init__(self, rudder_trim):
+    def __init__(self, rudder_trim, fast_boot=False):   # with fast_boot, call start() before the first print
         spi = SPI(1, 32000000, polarity=0, phase=0, sck=Pin(10), mosi=Pin(11), miso=Pin(8))
         cs = Pin(6)
         dc = Pin(7)
@@ -74,13 +90,24 @@ class Display:
         busy = Pin(12)
 
         self.e = epaper1in54.EPD(spi, cs, dc, rst, busy)
-        self.e.init(False)
-        self.e.clear(0xFF)  # necessary to overwrite everything
-        self.e.init(True)
-        self.e.clear(0xFF)  # necessary to overwrite everything
+        if not fast_boot:
+            self.e.init(False)
+            self.e.clear(0xFF)  # necessary to overwrite everything
+            self.e.init(True)
+            self.e.clear(0xFF)  # necessary to overwrite everything
+        self.ram_valid = not fast_boot   # False while the content of the display RAM is unknown
+        self.ghosting = ghosting.GhostTracker(self.e.width, self.e.height)
+        if fast_boot:   # the panel was not cleared, a full refresh is due
+            self.ghosting.invalidate()
         self.buf = bytearray(self.e.width * self.e.height // 8)
         self.fb = framebuf.FrameBuffer(self.buf, self.e.width, self.e.height, framebuf.MONO_HLSB)
         self.fb.fill(white)
+        self.sent = bytearray(self.buf)   # front buffer: frame as it is in the display RAM, white after clear
+        self.buf_mv = memoryview(self.buf)
+        self.sent_mv = memoryview(self.sent)
+        self.row = self.e.width // 8   # bytes per row
+        self.force = False   # the prepared frame is sent as a whole
+        self.span = None     # dirty window of the prepared frame, see dirty()
 
         if rudder_trim:
             self.indicator_hor = self.e.width - 10  # horizontal position of line on the right
@@ -91,109 +118,304 @@ class Display:
             self.indicator_up = 10  # start of indicator line
             self.indicator_down = self.e.height - 10  # where indicator stops
         self.indicate_rudder = rudder_trim
+        self.glyphs = {}      # rendered characters, key is (character code << 8) + pixel size
+        self.glyph_lru = []   # keys of glyphs, least recently used first
+        self.seven_segs = {}  # sprites of seven_seg_chars, key is (size << 8) + thickness
+
+        # voltage readout, only characters that changed are rendered again
+        self.volt_advance = SIZE_VOLT // 2 + SIZE_VOLT // 4
+        self.volt_height = SIZE_VOLT + SIZE_VOLT // 8
+        self.volt_width = VOLT_CHARS * self.volt_advance
+        self.volt = framebuf.FrameBuffer(bytearray((self.volt_width + 7) // 8 * self.volt_height), self.volt_width,
+                                         self.volt_height, framebuf.MONO_HLSB)
+        self.volt.fill(white)
+        self.volt_text = ''
+
+        # pointer sprites and their position for each percentage from -100 to 100 (index percentage + 100)
+        self.elevator_sprite = framebuf.FrameBuffer(
+            bytearray((SIZE_TRIANGLE + SIZE_TRIANGLE_POINTER - INDICATOR_LINE + 7) // 8 * SIZE_TRIANGLE),
+            SIZE_TRIANGLE + SIZE_TRIANGLE_POINTER - INDICATOR_LINE, SIZE_TRIANGLE, framebuf.MONO_HLSB)
+        self.elevator_sprite.fill(white)
+        self.draw_elevator_pointer(self.elevator_sprite, SIZE_TRIANGLE + SIZE_TRIANGLE_POINTER, SIZE_TRIANGLE // 2)
+        self.elevator_x = self.indicator_hor - SIZE_TRIANGLE - SIZE_TRIANGLE_POINTER
+        zeroy = self.indicator_up + math.floor((self.indicator_down - self.indicator_up) / 2)
+        length_indicator = self.indicator_down - self.indicator_up
+        self.elevator_y = array('h', (zeroy + math.floor(length_indicator / 200 * p) - SIZE_TRIANGLE // 2
+                                      for p in range(-100, 101)))
+
+        self.rudder_sprite = framebuf.FrameBuffer(
+            bytearray((SIZE_TRIANGLE + 7) // 8 * (SIZE_TRIANGLE + SIZE_TRIANGLE_POINTER - INDICATOR_LINE)),
+            SIZE_TRIANGLE, SIZE_TRIANGLE + SIZE_TRIANGLE_POINTER - INDICATOR_LINE, framebuf.MONO_HLSB)
+        self.rudder_sprite.fill(white)
+        self.draw_rudder_pointer(self.rudder_sprite, SIZE_TRIANGLE // 2, SIZE_TRIANGLE + SIZE_TRIANGLE_POINTER)
+        self.rudder_y = self.e.height - 1 - SIZE_TRIANGLE_POINTER - SIZE_TRIANGLE
+        half = (self.e.width - 32 - 2 * INDICATOR_LINE) // 2
+        self.rudder_x = array('h', (16 + INDICATOR_LINE + math.floor(half + p / 100 * half) - SIZE_TRIANGLE // 2
+                                    for p in range(-100, 101)))
+
+        # pre-rendered backgrounds, every frame starts with a copy of one of these
+        self.backgrounds = {LAYOUT_ELEVATOR: self.background(True, False)}
+        if rudder_trim:
+            self.backgrounds[LAYOUT_ELEVATOR_RUDDER] = self.background(True, True)
+            self.backgrounds[LAYOUT_SETUP_RUDDER] = self.background(False, True)
+        self.fb.fill(white)
+
+    def background(self, elevator, rudder):   # renders everything static of a layout, returns a copy
+        self.fb.fill(white)
+        self.text('Trim', 5, 5, 24)
+        self.text('Ind', 17, 32, 24)
+        self.text('V', 78, 92, 16)
+        if elevator:
+            self.elevator_scale()
+        if rudder:
+            self.rudder_scale()
+        return bytearray(self.buf)
+
+    def print(self, force=False):   # sends only the changed part of the frame, returns False if nothing changed
+        return self.prepare(force) and self.send()
+
+    def prepare(self, force=False):
+        # diffs the frame rendered into buf with the frame on the panel, can run while the panel is busy.
+        # A frame prepared before, but not sent yet, is replaced. Returns False if there is nothing to send
+        t = profiler.start()
+        self.force = self.force or force or not self.ram_valid
+        self.span = None if self.force else self.dirty()
+        profiler.stop(PROBE_PREPARE, t)
+        return self.pending()
+
+    def pending(self):   # True if a prepared frame waits for send
+        return self.force or self.span is not None
+
+    def send(self):   # sends the prepared frame, call when the panel is idle. Returns False if there was none
+        t = profiler.start()
+        if self.force:
+            self.e.use_lut('partial')
+            self.e.display_part(self.buf)
+            self.ghosting.add_all(self.sent, self.buf)
+        else:
+            span = self.span
+            if span is None:
+                profiler.stop(PROBE_SEND, t)
+                return False
+            y0, y1, bx0, bx1 = span
+            # small changes like a pointer move get the fast waveform, larger ones the partial waveform
+            self.e.use_lut('fast' if (y1 - y0 + 1) * (bx1 - bx0 + 1) <= FAST_BYTES else 'partial')
+            self.e.display_window(self.buf, bx0 * 8, y0, bx1 * 8 + 7, y1)
+            self.ghosting.add(self.sent, self.buf, y0, y1, bx0, bx1)
+        self.sent_mv[:] = self.buf
+        self.ram_valid = True
+        self.force = False
+        self.span = None
+        profiler.stop(PROBE_SEND, t)
+        return True
+
+    async def start(self):   # fast boot: brings the panel into partial mode without clearing it
+        await self.e.init_async(False)
+        await self.e.init_async(True)
+
+    @profiler.timed_async('display.condition')
+    async def condition(self):
+        # full waveform refresh of the frame last sent, restores the contrast after a fast boot. Call when idle
+        await self.wait_idle()
+        self.e.use_lut('full')
+        self.e.write_ram(self.sent)
+        await self.e.refresh(True)
+        self.ghosting.clear()
 
-    def print(self):
-        self.e.display_part(self.buf)
+    def clean_due(self):   # True if ghosting has built up and condition() should run when idle
+        return self.ghosting.due()
+
+    def asleep(self):
+        return self.e.asleep
+
+    async def sleep(self):   # deep sleep of the panel, the image stays visible
+        await self.wait_idle()
+        self.e.sleep()
+
+    async def wake(self):   # call before the next print after sleep
+        if self.e.asleep:
+            await self.e.init_async(True)
+            self.ram_valid = False
+            self.ghosting.invalidate()   # the previous image in the controller is lost, clean when idle
+            self.force = self.pending()   # a frame prepared while asleep is sent in full
+
+    def dirty(self):
+        # compares buf with the frame last sent, returns None if identical,
+        # otherwise (first row, last row, first byte, last byte) of the changed area
+        if self.buf == self.sent:
+            return None
+        b = self.buf_mv
+        s = self.sent_mv
+        row = self.row
+        i = 0
+        while b[i] == s[i]:
+            i += 1
+        j = len(b) - 1
+        while b[j] == s[j]:
+            j -= 1
+        y0 = i // row
+        y1 = j // row
+        left = row
+        right = -1
+        for y in range(y0, y1 + 1):   # only scan columns outside of what is already known to be dirty
+            base = y * row
+            c = 0
+            while c < left and b[base + c] == s[base + c]:
+                c += 1
+            left = c
+            c = row - 1
+            while c > right and b[base + c] == s[base + c]:
+                c -= 1
+            right = c
+        return y0, y1, left, right
 
     # self.fb.fill_rect(0, 0 self.e.width, self.e.height, white)
 
     def busy(self):
         return self.e.busy()
 
-    def seven_seg_char(self, x, y, size, thick, character):
+    async def wait_idle(self):
+        await self.e.wait_idle()
+
+    def idle_us(self):   # ticks_us at which the panel became idle last
+        return self.e.idle_us
+
+    def seven_seg_sprites(self, size, thick):   # renders all seven_seg_chars for size and thickness once
+        key = (size << 8) + thick
+        sprites = self.seven_segs.get(key)
+        if sprites is None:
+            w = size // 2 + thick
+            h = size + thick
+            sprites = []
+            for character in seven_seg_chars:
+                sprite = framebuf.FrameBuffer(bytearray((w + 7) // 8 * h), w, h, framebuf.MONO_HLSB)
+                sprite.fill(white)
+                self.seven_seg_draw(sprite, 0, 0, size, thick, character)
+                sprites.append(sprite)
+            self.seven_segs[key] = sprites
+        return sprites
+
+    @staticmethod
+    def seven_seg_draw(fb, x, y, size, thick, character):
         if character == '+':
-            self.fb.fill_rect(x, y + size // 2 - thick // 2, size // 2, thick, black)  # "-" part
-            self.fb.fill_rect(x + size // 4 - thick // 2, y + size // 4, thick, size // 2, black)  # "|" part
+            fb.fill_rect(x, y + size // 2 - thick // 2, size // 2, thick, black)  # "-" part
+            fb.fill_rect(x + size // 4 - thick // 2, y + size // 4, thick, size // 2, black)  # "|" part
         elif character == '-':
-            self.fb.fill_rect(x, y + size // 2 - thick // 2, size // 2, thick, black)
+            fb.fill_rect(x, y + size // 2 - thick // 2, size // 2, thick, black)
         elif character == '.':
-            self.fb.fill_rect(x + size // 4 - thick // 2, y + size - thick // 2, thick, thick, black)
+            fb.fill_rect(x + size // 4 - thick // 2, y + size - thick // 2, thick, thick, black)
         elif '0' <= character <= '9':
             number = ord(character) - ord('0')
             for led in nums[number]:
                 if led == 1:
-                    self.fb.fill_rect(x, y, size // 2 + thick, thick, black)
+                    fb.fill_rect(x, y, size // 2 + thick, thick, black)
                 elif led == 2:
-                    self.fb.fill_rect(x, y + size // 2, size // 2 + thick, thick, black)
+                    fb.fill_rect(x, y + size // 2, size // 2 + thick, thick, black)
                 elif led == 3:
-                    self.fb.fill_rect(x, y + 2 * size // 2, size // 2 + thick, thick, black)
+                    fb.fill_rect(x, y + 2 * size // 2, size // 2 + thick, thick, black)
                 elif led == 4:
-                    self.fb.fill_rect(x, y, thick, size // 2 + thick, black)
+                    fb.fill_rect(x, y, thick, size // 2 + thick, black)
                 elif led == 5:
-                    self.fb.fill_rect(x, y + size // 2, thick, size // 2 + thick, black)
+                    fb.fill_rect(x, y + size // 2, thick, size // 2 + thick, black)
                 elif led == 6:
-                    self.fb.fill_rect(x + size // 2, y, thick, size // 2 + thick, black)
+                    fb.fill_rect(x + size // 2, y, thick, size // 2 + thick, black)
                 elif led == 7:
-                    self.fb.fill_rect(x + size // 2, y + size // 2, thick, size // 2 + thick, black)
+                    fb.fill_rect(x + size // 2, y + size // 2, thick, size // 2 + thick, black)
 
-    def seven_seg_number(self, x, y, size, format_string, number):  # print an int value as seven segments
-        # example seven_seg_float(10,30, 10,'{:+2.1}', 12.7)
-        s = format_string.format(number)
-        xpos = x
-        for c in s:
-            self.seven_seg_char(xpos, y, size, size // 8, c)
-            xpos += size // 2 + size // 4
+    def voltage(self, x, y, power):   # voltage readout in SIZE_VOLT seven segments
+        s = '{:+2.1f}'.format(power)
+        old = self.volt_text
+        if s != old:
+            sprites = self.seven_seg_sprites(SIZE_VOLT, SIZE_VOLT // 8)
+            for n in range(0, VOLT_CHARS):
+                c = s[n] if n < len(s) else ' '
+                if c == (old[n] if n < len(old) else ' '):
+                    continue   # unchanged character
+                xpos = n * self.volt_advance
+                self.volt.fill_rect(xpos, 0, self.volt_advance, self.volt_height, white)
+                i = seven_seg_chars.find(c)
+                if i >= 0:
+                    self.volt.blit(sprites[i], xpos, 0)
+            self.volt_text = s
+        self.fb.blit(self.volt, x, y, white)
 
     def text(self, t, xpos, ypos, size):  # print a text at x y position, size should be a multiple of 8
         pixelsize = size // 8
-        for i in range(0, len(t)):
-            if 'A' <= t[i] <= 'Z':
-                font = font8x8.font8x8_capitals
-                index = ord(t[i]) - ord('A')
-            elif 'a' <= t[i] <= 'z':
-                font = font8x8.font8x8_smalls
-                index = ord(t[i]) - ord('a')
-            elif '0' <= t[i] <= '9':
-                font = font8x8.font8x8_numbers
-                index = ord(t[i]) - ord('0')
-            elif '!' <= t[i] <= '&':
-                font = font8x8.font8x8_specials
-                index = ord(t[i]) - ord('!')
-            elif t[i] == '?':
-                font = font8x8.font8x8_specials
-                index = 1    # '?' is not in ascii iteration, so handle it special
-            else:
-                continue
-
-            for y in range(0, 8):
-                for x in range(0, 8):
-                    if font[index * 8 + y] & (128 >> x):
-                        self.fb.fill_rect(xpos + x * pixelsize, ypos + y * pixelsize, pixelsize, pixelsize, black)
-            xpos += 8 * pixelsize
+        for c in t:
+            g = self.glyph(c, pixelsize)
+            if g is not None:
+                self.fb.blit(g, xpos, ypos, white)   # white is transparent
+                xpos += 8 * pixelsize
 
-    def indicator(self, percentage, rudder_percentage, power, setupmode):
+    def glyph(self, c, pixelsize):   # returns a rendered character from the cache, None if not in the font
+        key = (ord(c) << 8) + pixelsize
+        g = self.glyphs.get(key)
+        if g is not None:
+            if self.glyph_lru[-1] != key:
+                self.glyph_lru.remove(key)
+                self.glyph_lru.append(key)
+            return g
 
-        self.fb.fill(white)
-        # self.fb.fill_rect(0, 0, self.e.width, self.e.height, white)
+        if 'A' <= c <= 'Z':
+            font = font8x8.font8x8_capitals
+            index = ord(c) - ord('A')
+        elif 'a' <= c <= 'z':
+            font = font8x8.font8x8_smalls
+            index = ord(c) - ord('a')
+        elif '0' <= c <= '9':
+            font = font8x8.font8x8_numbers
+            index = ord(c) - ord('0')
+        elif '!' <= c <= '&':
+            font = font8x8.font8x8_specials
+            index = ord(c) - ord('!')
+        elif c == '?':
+            font = font8x8.font8x8_specials
+            index = 1    # '?' is not in ascii iteration, so handle it special
+        else:
+            return None
 
-        self.text('Trim', 5, 5, 24)
-        self.text('Ind', 17, 32, 24)
-        self.seven_seg_number(13, 90, SIZE_VOLT, '{:+2.1f}', power)
-        self.text('V', 78, 92, 16)
+        w = 8 * pixelsize
+        g = framebuf.FrameBuffer(bytearray((w + 7) // 8 * w), w, w, framebuf.MONO_HLSB)
+        g.fill(white)
+        for y in range(0, 8):
+            for x in range(0, 8):
+                if font[index * 8 + y] & (128 >> x):
+                    g.fill_rect(x * pixelsize, y * pixelsize, pixelsize, pixelsize, black)
+
+        if len(self.glyph_lru) >= GLYPH_CACHE_SIZE:
+            del self.glyphs[self.glyph_lru.pop(0)]
+        self.glyphs[key] = g
+        self.glyph_lru.append(key)
+        return g
+
+    def indicator(self, percentage, rudder_percentage, power, setupmode):
+        t = profiler.start()
+        if setupmode == 0 or setupmode == 1:
+            layout = LAYOUT_ELEVATOR_RUDDER if self.indicate_rudder else LAYOUT_ELEVATOR
+        elif setupmode == 2:   # setup elevator trim
+            layout = LAYOUT_ELEVATOR
+        else:
+            layout = LAYOUT_SETUP_RUDDER
+        self.buf_mv[:] = self.backgrounds[layout]
+
+        self.voltage(13, 90, power)
 
         if setupmode == 0 or setupmode == 1:
-            self.elevator_indicator(percentage)
+            self.elevator_pointer(percentage)
             if self.indicate_rudder:
-                self.rudder_indicator(rudder_percentage)
+                self.rudder_pointer(rudder_percentage)
             if setupmode == 1:  # indicate waiting for another button press
                 self.text('Setup?', 5, 120, 16)
         if setupmode >= 2:  # indicate setup mode
             # self.fb.fill_rect(5, 0, 15, 15, black)   # black indication left upper corner
             self.text('Setup', 5, 120, 16)
-            if setupmode == 2:  # setup trim up
-                self.elevator_indicator(+100)
-            elif setupmode == 3:  # setup trim neutral
-                self.elevator_indicator(0)
-            elif setupmode == 4:  # setup trim down
-                self.elevator_indicator(-100)
-            elif setupmode == 5:  # setup rudder left
-                self.rudder_indicator(+100)
-            elif setupmode == 6:  # setup rudder neutral
-                self.rudder_indicator(0)
-            elif setupmode == 7:  # setup rudder right
-                self.rudder_indicator(-100)
-
-    def elevator_indicator(self, percentage):
+            if setupmode == 2:  # setup elevator trim, percentage is the position to be set
+                self.elevator_pointer(percentage)
+            else:  # setup rudder trim
+                self.rudder_pointer(rudder_percentage)
+        profiler.stop(PROBE_INDICATOR, t)
+
+    def elevator_scale(self):
         zeroy = self.indicator_up + math.floor((self.indicator_down - self.indicator_up) / 2)
         length_indicator = self.indicator_down - self.indicator_up
         self.fb.fill_rect(self.indicator_hor - INDICATOR_LINE, self.indicator_up, INDICATOR_LINE,
@@ -207,15 +429,22 @@ class Display:
         self.fb.fill_rect(self.indicator_hor - INDICATOR_END, zeroy - INDICATOR_LINE // 2, INDICATOR_END,
                           INDICATOR_LINE, black)  # neutral line
 
-        posy = zeroy + math.floor(length_indicator / 200 * percentage)
+    def elevator_pointer(self, percentage):   # percentage is an int, limited to -100 .. 100
+        if percentage > 100:
+            percentage = 100
+        elif percentage < -100:
+            percentage = -100
+        self.fb.blit(self.elevator_sprite, self.elevator_x, self.elevator_y[percentage + 100], white)
 
+    @staticmethod
+    def draw_elevator_pointer(fb, hor, posy):   # triangle pointing right to hor, centered at posy
         for i in range(0, SIZE_TRIANGLE // 4):
-            self.fb.fill_rect(self.indicator_hor - SIZE_TRIANGLE - SIZE_TRIANGLE_POINTER + i * 4,
-                              posy - SIZE_TRIANGLE // 2 + i * 2, 4, SIZE_TRIANGLE - i * 4, black)
-        self.fb.fill_rect(self.indicator_hor - SIZE_TRIANGLE_POINTER - INDICATOR_LINE, posy - INDICATOR_LINE // 2,
-                          SIZE_TRIANGLE_POINTER, INDICATOR_LINE, black)
+            fb.fill_rect(hor - SIZE_TRIANGLE - SIZE_TRIANGLE_POINTER + i * 4,
+                         posy - SIZE_TRIANGLE // 2 + i * 2, 4, SIZE_TRIANGLE - i * 4, black)
+        fb.fill_rect(hor - SIZE_TRIANGLE_POINTER - INDICATOR_LINE, posy - INDICATOR_LINE // 2,
+                     SIZE_TRIANGLE_POINTER, INDICATOR_LINE, black)
 
-    def rudder_indicator(self, percentage):
+    def rudder_scale(self):
         self.text('L', 0, self.e.height - 16, 16)
         self.text('R', self.e.width - 16, self.e.height - 16, 16)
         self.fb.fill_rect(16, self.e.height - INDICATOR_LINE, self.e.width - 1 - 2 * 16,
@@ -228,11 +457,18 @@ class Display:
                           INDICATOR_LINE, INDICATOR_NEUTRAL, black)
         # neutral line
 
-        posx = 16 + INDICATOR_LINE + math.floor(((self.e.width - 32 - 2 * INDICATOR_LINE) // 2) +
-                                                percentage / 100 * ((self.e.width - 32 - 2 * INDICATOR_LINE) // 2))
+    def rudder_pointer(self, percentage):   # percentage is an int, limited to -100 .. 100
+        if percentage > 100:
+            percentage = 100
+        elif percentage < -100:
+            percentage = -100
+        self.fb.blit(self.rudder_sprite, self.rudder_x[percentage + 100], self.rudder_y, white)
+
+    @staticmethod
+    def draw_rudder_pointer(fb, posx, bottom):   # triangle pointing down to bottom, centered at posx
         for i in range(0, SIZE_TRIANGLE // 4):
-            self.fb.fill_rect(posx - SIZE_TRIANGLE // 2 + i * 2,
-                              self.e.height - 1 - SIZE_TRIANGLE_POINTER - SIZE_TRIANGLE + i * 4,
-                              SIZE_TRIANGLE - i * 4, 4, black)
-        self.fb.fill_rect(posx - INDICATOR_LINE // 2, self.e.height - 1 - INDICATOR_LINE - SIZE_TRIANGLE_POINTER,
-                          INDICATOR_LINE, SIZE_TRIANGLE_POINTER, black)
+            fb.fill_rect(posx - SIZE_TRIANGLE // 2 + i * 2,
+                         bottom - SIZE_TRIANGLE_POINTER - SIZE_TRIANGLE + i * 4,
+                         SIZE_TRIANGLE - i * 4, 4, black)
+        fb.fill_rect(posx - INDICATOR_LINE // 2, bottom - INDICATOR_LINE - SIZE_TRIANGLE_POINTER,
+                     INDICATOR_LINE, SIZE_TRIANGLE_POINTER, black)
@@ -0,0 +1,202 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Optional execution of the display pipeline on the second core of the RP2040.
+Core 0 keeps acquisition and user interface, core 1 renders and drives the e-paper. Both exchange the latest
+indication through a Mailbox. On a PC a normal thread can be used instead of core 1.
+"""
+
+import _thread
+import time
+import uasyncio
+from micropython import const
+from array import array
+import display
+
+# slots of the mailbox state
+ELEVATOR = const(0)
+RUDDER = const(1)
+POWER = const(2)    # in 1/100 V
+STATUS = const(3)
+FLAGS = const(4)
+STATE_SIZE = const(5)
+
+FLAG_FORCE = const(1)       # send the full frame
+FLAG_CONDITION = const(2)   # full waveform refresh of the frame shown
+FLAG_SLEEP = const(4)       # deep sleep of the panel, the next post wakes it
+
+POLL_MS = const(10)   # how often core 1 looks for a new state, how often core 0 checks it was processed
+
+
+class Mailbox:   # latest state posted by core 0, older states that were not fetched yet are overwritten
+    def __init__(self):
+        self.lock = _thread.allocate_lock()
+        self.state = array('h', bytes(2 * STATE_SIZE))
+        self.posted = 0      # sequence number of the latest post
+        self.fetched = 0     # sequence number of the latest post fetched by core 1
+        self.done = 0        # sequence number of the latest post displayed by core 1
+        self.ready = False   # core 1 has initialized the display
+        self.clean_due = False   # ghosting has built up, a condition post is due when idle
+        self.running = True
+
+    def post(self, elevator, rudder, power, status, flags):   # returns the sequence number of this post
+        self.lock.acquire()
+        s = self.state
+        s[ELEVATOR] = elevator
+        s[RUDDER] = rudder
+        s[POWER] = power
+        s[STATUS] = status
+        s[FLAGS] = s[FLAGS] | flags if self.posted != self.fetched else flags   # keep flags of a skipped post
+        self.posted += 1
+        seq = self.posted
+        self.lock.release()
+        return seq
+
+    def fetch(self, into):   # copies the latest state into an array, returns its sequence number
+        self.lock.acquire()
+        s = self.state
+        for i in range(0, STATE_SIZE):
+            into[i] = s[i]
+        seq = self.posted
+        self.fetched = seq
+        self.lock.release()
+        return seq
+
+
+def display_core(mailbox, rudder_trim):   # display loop, runs on core 1
+    d = display.Display(rudder_trim)
+    mailbox.ready = True
+    state = array('h', bytes(2 * STATE_SIZE))
+    seen = 0
+    while mailbox.running:
+        seq = mailbox.fetch(state)
+        if seq == seen:
+            time.sleep_ms(POLL_MS)
+            continue
+        seen = seq
+        if d.e.asleep and not state[FLAGS] & FLAG_SLEEP:   # same as Display.wake, but blocking
+            d.e.init(True)
+            d.ram_valid = False
+            d.ghosting.invalidate()
+        d.indicator(state[ELEVATOR], state[RUDDER], state[POWER] / 100, state[STATUS])
+        if d.print(state[FLAGS] & FLAG_FORCE):
+            d.e.wait_until_idle()
+        if state[FLAGS] & FLAG_CONDITION:   # same as Display.condition, but blocking
+            d.e.use_lut('full')
+            d.e.write_ram(d.sent)
+            d.e.turn_on_display()
+            d.ghosting.clear()
+        mailbox.clean_due = d.clean_due()
+        if state[FLAGS] & FLAG_SLEEP and not d.e.asleep:
+            d.e.sleep()
+        mailbox.done = seq
+
+
+class RemoteDisplay:
+    # used on core 0 in place of display.Display, forwards the indication to display_core on core 1
+    def __init__(self, rudder_trim, start_thread=_thread.start_new_thread):
+        self.mailbox = Mailbox()
+        self.last = array('h', bytes(2 * STATE_SIZE))   # last state posted
+        self.next = array('h', bytes(2 * STATE_SIZE))   # state set by indicator
+        self.seq = 0
+        self.sleeping = False
+        self.force = False
+        self.changed = False   # the state set by indicator differs from the last one posted
+        start_thread(display_core, (self.mailbox, rudder_trim))
+
+    def indicator(self, percentage, rudder_percentage, power, setupmode):
+        n = self.next
+        n[ELEVATOR] = percentage
+        n[RUDDER] = rudder_percentage
+        n[POWER] = int(power * 100)
+        n[STATUS] = setupmode
+
+    def print(self, force=False):   # returns False if the indication did not change, like Display.print
+        return self.prepare(force) and self.send()
+
+    def prepare(self, force=False):   # like Display.prepare
+        n = self.next
+        last = self.last
+        self.force = self.force or force
+        self.changed = self.force or not self.seq or n[ELEVATOR] != last[ELEVATOR] or \
+            n[RUDDER] != last[RUDDER] or n[POWER] != last[POWER] or n[STATUS] != last[STATUS]
+        return self.changed
+
+    def pending(self):
+        return self.changed
+
+    def send(self):   # like Display.send, core 1 drops posts it had no time for
+        if not self.changed:
+            return False
+        n = self.next
+        last = self.last
+        for i in range(0, STATE_SIZE):
+            last[i] = n[i]
+        self.seq = self.mailbox.post(n[ELEVATOR], n[RUDDER], n[POWER], n[STATUS], FLAG_FORCE if self.force else 0)
+        self.force = False
+        self.changed = False
+        return True
+
+    def busy(self):
+        return self.mailbox.done != self.seq
+
+    async def wait_idle(self):
+        while self.mailbox.done != self.seq:
+            await uasyncio.sleep_ms(POLL_MS)
+
+    def idle_us(self):   # core 1 does not report the edge, the end of wait_idle is close enough
+        return time.ticks_us()
+
+    async def start(self):   # core 1 does the display init, wait for it
+        while not self.mailbox.ready:
+            await uasyncio.sleep_ms(POLL_MS)
+
+    async def condition(self):
+        last = self.last
+        self.seq = self.mailbox.post(last[ELEVATOR], last[RUDDER], last[POWER], last[STATUS], FLAG_CONDITION)
+        await self.wait_idle()
+
+    def asleep(self):
+        return self.sleeping
+
+    async def sleep(self):
+        last = self.last
+        self.seq = self.mailbox.post(last[ELEVATOR], last[RUDDER], last[POWER], last[STATUS], FLAG_SLEEP)
+        self.sleeping = True
+        await self.wait_idle()
+
+    async def wake(self):   # core 1 wakes the panel with the next post
+        self.sleeping = False
+
+    def clean_due(self):
+        return self.mailbox.clean_due
+
+    def stop(self):   # ends display_core
+        self.mailbox.running = False
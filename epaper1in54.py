@@ -34,7 +34,10 @@ Copyright (c) 2018 Mike Causer https://github.com/mcauser/micropython-waveshare-
 """
 
 from micropython import const
-from time import sleep_ms
+from time import sleep_ms, ticks_us
+import uasyncio
+import profiler
+import monitor
 
 # Display resolution
 EPD_WIDTH = const(200)
@@ -64,6 +67,28 @@ SET_RAM_Y_ADDRESS_COUNTER            = const(0x4F)
 TERMINATE_FRAME_READ_WRITE           = const(0xFF)   # aka NOOP
 
 BUSY = const(1)  # 1=busy, 0=idle
+LUT_TIMING = const(60)     # offset of the phase timing groups in the 153 byte LUT
+FAST_PHASE = const(0x0A)   # frames of the drive phase of the fast waveform, the partial one has 0x0F
+BUSY_POLL_MS = const(100)  # wait_idle checks busy at least this often, in case an edge was missed
+PROBE_WAIT_IDLE = profiler.probe('epd.wait_idle')   # hot paths are timed inline, the decorators allocate
+PROBE_DISPLAY_PART = profiler.probe('epd.display_part')
+PROBE_DISPLAY_WINDOW = profiler.probe('epd.display_window')
+
+# command sequences as (command, parameters), sent by EPD.commands
+INIT_PARTIAL = ((0x37, b'\x00\x00\x00\x00\x00\x40\x00\x00\x00\x00'),
+                (BORDER_WAVEFORM_CONTROL, b'\x80'),
+                (DISPLAY_UPDATE_CONTROL_2, b'\xC0'),
+                (MASTER_ACTIVATION, None))
+INIT_FULL = ((DRIVER_OUTPUT_CONTROL, b'\xC7\x00\x01'),
+             (DATA_ENTRY_MODE_SETTING, b'\x01'))
+INIT_FULL_ACTIVATE = ((BORDER_WAVEFORM_CONTROL, b'\x01'),
+                      (0x18, b'\x80'),
+                      (DISPLAY_UPDATE_CONTROL_2, b'\xB1'),
+                      (MASTER_ACTIVATION, None))
+UPDATE_FULL = ((DISPLAY_UPDATE_CONTROL_2, b'\xC7'),
+               (MASTER_ACTIVATION, None))
+UPDATE_PART = ((DISPLAY_UPDATE_CONTROL_2, b'\xFF'),   # 0xCF would not load the temperature
+               (MASTER_ACTIVATION, None))
 
 
 class EPD:
@@ -72,13 +97,31 @@ class EPD:
         self.cs = cs
         self.dc = dc
         self.rst = rst
-        self.busy = busy
+        self.busy_pin = busy
         self.cs.init(self.cs.OUT, value=1)
         self.dc.init(self.dc.OUT, value=0)
         self.rst.init(self.rst.OUT, value=0)
-        self.busy.init(self.busy.IN)
+        self.busy_pin.init(self.busy_pin.IN)
+        self.idle_flag = uasyncio.ThreadSafeFlag()   # set when busy falls
+        self.idle_us = 0   # ticks_us of the latest falling edge of busy
+        self.busy_pin.irq(handler=self._busy_irq, trigger=self.busy_pin.IRQ_FALLING)
         self.width = EPD_WIDTH
         self.height = EPD_HEIGHT
+        # preallocated buffers, nothing is allocated when sending commands
+        self.cmd_buf = bytearray(1)
+        self.param_buf = bytearray(4)
+        params = memoryview(self.param_buf)
+        self.param1 = params[0:1]
+        self.param2 = params[0:2]
+        self.param4 = params[0:4]
+        self.row_buf = bytearray(EPD_WIDTH // 8)
+        # full init scans the gates reversed and writes RAM from y = height-1 downwards. After the reset of
+        # the partial init the controller is back to its defaults and writes from y = 0 upwards
+        self.y_reversed = False
+        self.asleep = False   # in deep sleep, only a reset wakes the controller
+        # waveform profiles by name, use_lut sends a profile only if it is not loaded already
+        self.luts = {'full': self.LUT_FULL_UPDATE, 'partial': self.LUT_PARTIAL_UPDATE, 'fast': self.LUT_FAST_UPDATE}
+        self.lut_name = None   # profile loaded, None after reset
 
     LUT_FULL_UPDATE = bytearray(b'\x80\x48\x40\x00\x00\x00\x00\x00\x00\x00\x00\x00'
                                 b'\x40\x48\x80\x00\x00\x00\x00\x00\x00\x00\x00\x00'
@@ -118,14 +161,23 @@ class EPD:
                                    b'\x00\x00\x00\x00\x00\x00\x00'
                                    b'\x22\x22\x22\x22\x22\x22\x00\x00\x00'
                                    b'\x02\x17\x41\xB0\x32\x28')
+    # same as the partial waveform with a shorter drive phase, for small changes. A little less contrast
+    LUT_FAST_UPDATE = bytearray(LUT_PARTIAL_UPDATE)
+    LUT_FAST_UPDATE[LUT_TIMING] = FAST_PHASE
 
-    def _command(self, command, data=None):
+    def _command(self, command, data=None):   # command and its parameter bytes in one chip select
+        self.cmd_buf[0] = command
         self.dc(0)
         self.cs(0)
-        self.spi.write(bytearray([command]))
-        self.cs(1)
+        self.spi.write(self.cmd_buf)
         if data is not None:
-            self._data(data)
+            self.dc(1)
+            self.spi.write(data)
+        self.cs(1)
+
+    def commands(self, sequence):   # sends a sequence of (command, parameters)
+        for command, data in sequence:
+            self._command(command, data)
 
     def _data(self, data):   # write full bytearray
         self.dc(1)
@@ -134,65 +186,93 @@ class EPD:
         self.cs(1)
 
     def send_data(self, data):   # write single byte
-        self.dc(1)
-        self.cs(0)
-        self.spi.write(bytearray([data]))
-        self.cs(1)
+        self.param_buf[0] = data
+        self._data(self.param1)
 
     def set_windows(self, xstart, ystart, xend, yend):
-        self._command(SET_RAM_X_ADDRESS_START_END_POSITION)
-        self.send_data((xstart >> 3) & 0xFF)
-        self.send_data((xend >> 3) & 0xFF)
-
-        self._command(SET_RAM_Y_ADDRESS_START_END_POSITION)
-        self.send_data(ystart & 0xFF)
-        self.send_data((ystart >> 8) & 0xFF)
-        self.send_data(yend & 0xFF)
-        self.send_data((yend >> 8) & 0xFF)
+        p = self.param_buf
+        p[0] = (xstart >> 3) & 0xFF
+        p[1] = (xend >> 3) & 0xFF
+        self._command(SET_RAM_X_ADDRESS_START_END_POSITION, self.param2)
+        p[0] = ystart & 0xFF
+        p[1] = (ystart >> 8) & 0xFF
+        p[2] = yend & 0xFF
+        p[3] = (yend >> 8) & 0xFF
+        self._command(SET_RAM_Y_ADDRESS_START_END_POSITION, self.param4)
 
     def set_cursor(self, xstart, ystart):
-        self._command(SET_RAM_X_ADDRESS_COUNTER)
-        self.send_data(xstart & 0xFF)
-        self._command(SET_RAM_Y_ADDRESS_COUNTER)
-        self.send_data(ystart & 0xFF)
-        self.send_data((ystart >> 8) & 0xFF)
+        p = self.param_buf
+        p[0] = xstart & 0xFF
+        self._command(SET_RAM_X_ADDRESS_COUNTER, self.param1)
+        p[0] = ystart & 0xFF
+        p[1] = (ystart >> 8) & 0xFF
+        self._command(SET_RAM_Y_ADDRESS_COUNTER, self.param2)
 
     def init(self, partial):
+        self.reset()
+        self.wait_until_idle()
         if partial:
-            self.reset()
-            self.wait_until_idle()
-            self.set_lut(self.LUT_PARTIAL_UPDATE)
-            self._command(0x37, bytearray(b'\x00\x00\x00\x00\x00\x40\x00\x00\x00\x00'))
-            self._command(BORDER_WAVEFORM_CONTROL, b'\x80')
-            self._command(DISPLAY_UPDATE_CONTROL_2, b'\xC0')
-            self._command(MASTER_ACTIVATION)
+            self.use_lut('partial')
+            self.commands(INIT_PARTIAL)
             self.wait_until_idle()
+            self.y_reversed = False
         else:
             # EPD hardware init start
-            self.reset()
-            self.wait_until_idle()
             self._command(SW_RESET)
             self.wait_until_idle()
-
-            self._command(DRIVER_OUTPUT_CONTROL, b'\xC7\x00\x01')
-            self._command(DATA_ENTRY_MODE_SETTING, b'\x01')
-            self.set_windows(0, self.height - 1, self.width - 1, 0)
-            self._command(BORDER_WAVEFORM_CONTROL, b'\x01')
-            self._command(0x18, b'\x80')
-            self._command(DISPLAY_UPDATE_CONTROL_2, b'\xB1')
-            self._command(MASTER_ACTIVATION)
-            self.set_cursor(0, self.height - 1)
+            self._init_full()
             self.wait_until_idle()
-            self.set_lut(self.LUT_FULL_UPDATE)
+            self.use_lut('full')
+            self.y_reversed = True
+
+    async def init_async(self, partial):   # same as init, but does not block other tasks
+        await self.reset_async()
+        await self.wait_idle()
+        if partial:
+            self.use_lut('partial')
+            self.commands(INIT_PARTIAL)
+            await self.wait_idle()
+            self.y_reversed = False
+        else:
+            self._command(SW_RESET)
+            await self.wait_idle()
+            self._init_full()
+            await self.wait_idle()
+            self.use_lut('full')
+            self.y_reversed = True
+
+    def _init_full(self):
+        self.commands(INIT_FULL)
+        self.set_windows(0, self.height - 1, self.width - 1, 0)
+        self.commands(INIT_FULL_ACTIVATE)
+        self.set_cursor(0, self.height - 1)
 
+    @profiler.timed('epd.wait_until_idle')
     def wait_until_idle(self):
-        while self.busy.value() == BUSY:
+        monitor.section('epd.wait_until_idle')
+        while self.busy():
             sleep_ms(100)
 
-    def busy(self):
-        return self.busy.value() == BUSY
+    async def wait_idle(self):   # returns when busy falls, other tasks run in the meantime
+        t = profiler.start()
+        while self.busy():
+            try:
+                await uasyncio.wait_for_ms(self.idle_flag.wait(), BUSY_POLL_MS)
+            except uasyncio.TimeoutError:
+                pass
+        profiler.stop(PROBE_WAIT_IDLE, t)
+
+    def _busy_irq(self, pin):
+        self.idle_us = ticks_us()   # for the latency trace, a small int does not allocate
+        self.idle_flag.set()
 
-    def reset(self):  # ok
+    def busy(self):   # busy stays high during deep sleep, that does not count
+        return not self.asleep and self.busy_pin.value() == BUSY
+
+    def reset(self):  # ok, also wakes from deep sleep
+        monitor.section('epd.reset')
+        self.asleep = False
+        self.lut_name = None
         self.rst(1)
         sleep_ms(200)
         self.rst(0)
@@ -200,41 +280,103 @@ class EPD:
         self.rst(1)
         sleep_ms(200)
 
+    async def reset_async(self):
+        self.asleep = False
+        self.lut_name = None
+        self.rst(1)
+        await uasyncio.sleep_ms(200)
+        self.rst(0)
+        await uasyncio.sleep_ms(5)
+        self.rst(1)
+        await uasyncio.sleep_ms(200)
+
     def lut(self, lut):  # ok
         self._command(WRITE_LUT_REGISTER, lut)
 
     def set_lut(self, lut):   # ok
+        self.lut_name = None   # not necessarily one of the profiles
+        lut = memoryview(lut)   # no copies of the slices
         self.lut(lut[0:153])
         self._command(0x3f, lut[153:154])
         self._command(0x03, lut[154:155])
         self._command(0x04, lut[155:158])
         self._command(0x2c, lut[158:159])
 
+    def use_lut(self, name):   # loads the waveform profile name, nothing is sent if it is loaded already
+        if name != self.lut_name:
+            self.set_lut(self.luts[name])
+            self.lut_name = name
+
+    def add_lut(self, name, lut):   # registers another waveform profile, 159 bytes like LUT_PARTIAL_UPDATE
+        self.luts[name] = lut
+        if name == self.lut_name:
+            self.lut_name = None
+
     def turn_on_display(self):
-        self._command(DISPLAY_UPDATE_CONTROL_2)
-        self.send_data(0xC7)
-        self._command(MASTER_ACTIVATION)
+        self.commands(UPDATE_FULL)
         self.wait_until_idle()
 
     def turn_on_display_part(self):
-        self._command(DISPLAY_UPDATE_CONTROL_2)
-        # self.send_data(0xCF)
-        self.send_data(0xFF)
-        self._command(MASTER_ACTIVATION)
+        self.commands(UPDATE_PART)
 
-    def clear(self, color):
-        self._command(0x24)
+    async def refresh(self, full=False):   # activates an update of the image in RAM and waits for it to finish
+        self.commands(UPDATE_FULL if full else UPDATE_PART)
+        await self.wait_idle()
+
+    def clear(self, color):   # streams one preallocated row for the whole RAM
+        monitor.section('epd.clear')
+        row = self.row_buf
+        for i in range(0, len(row)):
+            row[i] = color
+        self.set_full_window()
+        self._command(WRITE_RAM)
+        self.dc(1)
+        self.cs(0)
         for j in range(0, self.height):
-            for i in range(0, int(self.width / 8)):
-                self.send_data(color)
+            self.spi.write(row)
+        self.cs(1)
         self.turn_on_display()
 
     def display_part(self, buf):    # partial update with sync waiting to measure time once in init
-        self._command(0x24)
-        self._data(buf)
+        t = profiler.start()
+        self.write_ram(buf)
         self.turn_on_display_part()
+        profiler.stop(PROBE_DISPLAY_PART, t)
+
+    def write_ram(self, buf):   # writes a full frame into the display RAM without updating the display
+        self.set_full_window()
+        self._command(WRITE_RAM, buf)
+
+    def set_full_window(self):   # RAM window and cursor for the whole display
+        self.set_windows(0, self.ram_y(0), self.width - 1, self.ram_y(self.height - 1))
+        self.set_cursor(0, self.ram_y(0))
+
+    def ram_y(self, y):   # RAM row of framebuffer row y in the current mode, see y_reversed
+        return self.height - 1 - y if self.y_reversed else y
+
+    def display_window(self, buf, x0, y0, x1, y1):
+        # partial update, only sends the rectangle x0..x1, y0..y1 (inclusive, framebuffer coordinates) of buf
+        # x is rounded to whole bytes. The rest of the display RAM keeps the previously sent image
+        t = profiler.start()
+        row = self.width // 8
+        bx0 = x0 >> 3
+        bx1 = x1 >> 3
+        self.set_windows(bx0 << 3, self.ram_y(y0), bx1 << 3, self.ram_y(y1))
+        self.set_cursor(bx0, self.ram_y(y0))
+        self._command(WRITE_RAM)
+        mv = memoryview(buf)
+        self.dc(1)
+        self.cs(0)
+        if bx0 == 0 and bx1 == row - 1:   # full rows, one contiguous block
+            self.spi.write(mv[y0 * row:(y1 + 1) * row])
+        else:
+            for y in range(y0, y1 + 1):
+                self.spi.write(mv[y * row + bx0:y * row + bx1 + 1])
+        self.cs(1)
+        self.turn_on_display_part()
+        profiler.stop(PROBE_DISPLAY_WINDOW, t)
 
     # to wake call reset() or init()
-    def sleep(self):
+    def sleep(self):   # the image stays, init wakes the panel again
         self._command(DEEP_SLEEP_MODE, b'\x01')  # enter deep sleep A0=1, A0=0 power on
-        self.wait_until_idle()
+        self.asleep = True   # busy stays high until the next reset, do not wait for it
@@ -0,0 +1,92 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+
+Tracking of ghosting on the e-paper.
+Every partial refresh leaves a little residue of the previous image, most where pixels toggled often. The tracker
+counts partial refreshes and toggled pixels per region of the panel, when one region passes a limit a full
+waveform refresh is due.
+"""
+
+from micropython import const
+from array import array
+
+REGION_BYTES = const(5)   # region width in bytes, 40 pixels
+REGION_ROWS = const(40)   # region height in pixels
+POPCOUNT = bytes(bin(i).count('1') for i in range(256))   # set bits of a byte
+
+
+class GhostTracker:
+    def __init__(self, width, height, refresh_limit=300, toggle_limit=20000):
+        self.row = width // 8
+        self.cols = (self.row + REGION_BYTES - 1) // REGION_BYTES
+        self.rows = (height + REGION_ROWS - 1) // REGION_ROWS
+        self.refresh_limit = refresh_limit   # partial refreshes of a region before a full refresh is due
+        self.toggle_limit = toggle_limit     # toggled pixels in a region before a full refresh is due
+        self.refreshes = array('H', [0] * (self.cols * self.rows))
+        self.toggles = array('L', [0] * (self.cols * self.rows))
+        self.worst = 0   # highest damage of all regions, in 1/100 of the limit
+
+    def add(self, old, new, y0, y1, bx0, bx1):
+        # records a partial refresh of rows y0..y1 and bytes bx0..bx1 from frame old to frame new
+        row = self.row
+        pop = POPCOUNT
+        refreshes = self.refreshes
+        toggles = self.toggles
+        for ry in range(y0 // REGION_ROWS, y1 // REGION_ROWS + 1):
+            for rx in range(bx0 // REGION_BYTES, bx1 // REGION_BYTES + 1):
+                r = ry * self.cols + rx
+                n = 0
+                for y in range(max(y0, ry * REGION_ROWS), min(y1, ry * REGION_ROWS + REGION_ROWS - 1) + 1):
+                    base = y * row
+                    for i in range(base + max(bx0, rx * REGION_BYTES),
+                                   base + min(bx1, rx * REGION_BYTES + REGION_BYTES - 1) + 1):
+                        n += pop[old[i] ^ new[i]]
+                if refreshes[r] < 0xffff:
+                    refreshes[r] += 1
+                toggles[r] += n
+                damage = max(100 * refreshes[r] // self.refresh_limit, 100 * toggles[r] // self.toggle_limit)
+                if damage > self.worst:
+                    self.worst = damage
+
+    def add_all(self, old, new):   # records a partial refresh of the whole frame
+        self.add(old, new, 0, len(new) // self.row - 1, 0, self.row - 1)
+
+    def due(self):   # True if a full refresh should be done at the next idle time
+        return self.worst >= 100
+
+    def invalidate(self):   # the state of the panel is unknown, after a fast boot or a wake from deep sleep
+        self.worst = 100
+
+    def clear(self):   # call after a full refresh
+        for i in range(0, len(self.refreshes)):
+            self.refreshes[i] = 0
+            self.toggles[i] = 0
+        self.worst = 0
@@ -0,0 +1,88 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Change detection of the indicated trim, decides when a new value is worth a refresh of the display
+"""
+
+import time
+
+
+class ChangeDetector:
+    # changes smaller than deadband are ignored, a change against the direction of the previous one needs
+    # additional hysteresis and has to persist for dwell_ms before it is shown.
+    # Changes of fast_track or more are shown immediately
+    def __init__(self, deadband=2, hysteresis=1, dwell_ms=300, fast_track=5):
+        self.deadband = deadband
+        self.hysteresis = hysteresis
+        self.dwell_ms = dwell_ms
+        self.fast_track = fast_track
+        self.value = None      # value currently shown
+        self.direction = 0     # direction of the last accepted change, +1 or -1, 0 before the first change
+        self.pending = False   # a change is waiting for its dwell time
+        self.pending_since = 0
+
+    def update(self, value, now=None):   # returns True if value should be shown, self.value is updated then
+        if self.value is None:
+            self.value = value
+            return True
+        diff = value - self.value
+        if diff == 0:
+            self.pending = False
+            return False
+        direction = 1 if diff > 0 else -1
+        size = diff * direction
+        if size < self.fast_track:
+            threshold = self.deadband if direction == self.direction or self.direction == 0 \
+                else self.deadband + self.hysteresis
+            if size < threshold:
+                self.pending = False
+                return False
+            if now is None:
+                now = time.ticks_ms()
+            if not self.pending:
+                self.pending = True
+                self.pending_since = now
+            if time.ticks_diff(now, self.pending_since) < self.dwell_ms:
+                return False
+        self.value = value
+        self.direction = direction
+        self.pending = False
+        return True
+
+    def set(self, value):   # shows value without any filtering, e.g. after setup
+        self.value = value
+        self.pending = False
+
+    def remaining(self, now=None):   # ms until a pending change is due, None if nothing is pending
+        if not self.pending:
+            return None
+        if now is None:
+            now = time.ticks_ms()
+        return max(self.dwell_ms - time.ticks_diff(now, self.pending_since), 0)
@@ -0,0 +1,122 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+
+End-to-end latency of the indication, from the acquisition of a trim value to the end of the panel refresh
+showing it. Each published acquisition gets a sequence number and a ticks_us stamp, which travel with the value
+through the state to the frame prepared, sent and shown. The trace closes when busy of the panel drops.
+Samples that were published, but replaced by a newer one before they reached the panel, are counted as dropped,
+this includes changes held back by the deadband or the dwell time. Prepared frames that were replaced before
+they could be sent are counted as superseded.
+
+From the REPL or over USB serial: import main; main.tracer.report()
+"""
+
+import time
+from micropython import const
+from array import array
+
+HISTORY = const(128)   # number of latencies kept for the percentiles
+
+
+class Tracer:
+    def __init__(self, history=HISTORY, report_ms=0):
+        self.latencies = array('L', [0] * history)   # us, ring of the latest closed traces
+        self.report_ms = report_ms   # period of report(), 0 never
+        self.last_report = time.ticks_ms()
+        self.seq = 0           # sequence number of the latest sample
+        self.pending = 0       # sample of the frame prepared, 0 none
+        self.pending_us = 0
+        self.flight = 0        # sample of the frame sent and not yet shown, 0 none
+        self.flight_us = 0
+        self.sent_us = 0       # time the frame in flight was sent
+        self.shown = 0         # sample of the latest frame shown
+        self.closed = 0        # number of traces closed
+        self.dropped = 0       # samples never shown
+        self.superseded = 0    # frames prepared but replaced before sending
+        self.max_us = 0
+
+    def sample(self):   # returns the sequence number of a new acquisition
+        self.seq += 1
+        return self.seq
+
+    def prepared(self, seq, stamp_us):   # a frame showing sample seq was prepared
+        if self.pending:
+            self.superseded += 1
+        self.pending = seq
+        self.pending_us = stamp_us
+
+    def sent(self, sent):   # the presenter tried to send the prepared frame, sent is False if there was none
+        if self.pending and sent:
+            self.flight = self.pending
+            self.flight_us = self.pending_us
+            self.sent_us = time.ticks_us()
+        elif self.pending:
+            self.superseded += 1
+        self.pending = 0
+
+    def done(self, idle_us):   # busy dropped at idle_us after the frame in flight
+        seq = self.flight
+        if not seq:
+            return
+        self.flight = 0
+        if time.ticks_diff(idle_us, self.sent_us) < 0:   # falling edge was missed, busy was polled
+            idle_us = time.ticks_us()
+        if seq > self.shown:   # a forced refresh of the same sample is no new trace
+            if seq > self.shown + 1:
+                self.dropped += seq - self.shown - 1
+            self.shown = seq
+            us = time.ticks_diff(idle_us, self.flight_us)
+            self.latencies[self.closed % len(self.latencies)] = us
+            self.closed += 1
+            if us > self.max_us:
+                self.max_us = us
+        now = time.ticks_ms()
+        if self.report_ms and time.ticks_diff(now, self.last_report) >= self.report_ms:
+            self.last_report = now
+            self.report()
+
+    def kept(self):   # latencies in us of the latest traces, at most history of them
+        return self.latencies[:min(self.closed, len(self.latencies))]
+
+    def percentile(self, p):   # nearest rank percentile in us of the traces kept, p from 0 to 100
+        s = sorted(self.kept())
+        if not s:
+            return 0
+        return s[min(len(s) - 1, max(0, (len(s) * p + 99) // 100 - 1))]
+
+    def reset(self):
+        self.closed = self.dropped = self.superseded = self.max_us = 0
+        self.shown = self.seq
+
+    def report(self):
+        print('Latency: {:d} samples shown, p50 {:d} ms, p95 {:d} ms, max {:d} ms'.format(
+            self.closed, self.percentile(50) // 1000, self.percentile(95) // 1000, self.max_us // 1000))
+        print('Latency: {:d} samples dropped, {:d} frames superseded'.format(self.dropped, self.superseded))
@@ -31,7 +31,7 @@
 """
 
 
-from machine import ADC, Pin
+from machine import Pin
 import uasyncio
 import display
 import async_button
@@ -39,210 +39,300 @@ import time
 from micropython import const
 import config
 import json
+import acquisition
+import hysteresis
+import calibration
+import dualcore
+import statebus
+import power
+import profiler
+import latency
+import monitor
 
 
 SET_TIME_MS = const(10000)      # time for two subsequent long presses before going into setup mode
-DISPLAY_WAKEUP = const(50)      # number of refreshs after start, to get better contrast on the display
 DIVIDER_R1 = 10000               # resistance in Ohms of R1 resistor connected to main power
 DIVIDER_R2 = 1000                # resistance in Ohms of R2 resistor of voltage divider
 VOLTAGE_FACTOR = 3.3 / 65536
 RUDDER_TRIM = False              # True if also rudder trim is desired
+FAST_BOOT = True                 # show the first indication before conditioning the display
+SAMPLE_MS = 100                  # time between two acquisitions of the analog inputs
+ADC_BURST = 8                    # number of samples per channel and acquisition, the median is used
+ADC_IIR_SHIFT = 2                # smoothing of the medians, each acquisition moves the value by 1/2**shift
+DEADBAND = 2                     # percent, smaller changes of the indication are not displayed
+HYSTERESIS = 1                   # percent, additional change needed to reverse the direction of the indication
+DWELL_MS = 300                   # time a small change has to persist before it is displayed
+FAST_TRACK = 5                   # percent, changes of this size are displayed immediately
+CAL_POINTS = 3                   # calibration points per axis in setup, odd number from 3 to 9
+DUAL_CORE = False                # True renders and drives the display on the second core
+STABLE_MS = 10000                # time without a change of the indication before sampling slows down
+SLOW_SAMPLE_MS = 500             # time between two acquisitions when the indication is stable
+PANEL_SLEEP_MS = 60000           # time without a change before the display goes to deep sleep, 0 never
+LIGHTSLEEP = False               # True puts the Pico into lightsleep between samples while the display sleeps
+POWER_REPORT_MS = 600000         # period of printing the time spent in each power state, 0 never
+CLEAN_IDLE_MS = 5000             # time without a change before a full refresh against ghosting may run
+LATENCY_REPORT_MS = 600000       # period of printing the latency from acquisition to indication, 0 never
+MONITOR_MS = 0                   # period of measuring the lag of the task scheduler, 0 no monitor and no watchdog
+MONITOR_REPORT_MS = 600000       # period of printing the worst lag and the task heartbeats, 0 never
+WDT_MS = 0                       # reset by watchdog after a stall this long, 0 none, above the display init, max 8388
+TASK_LIMIT_MS = 5000             # time a display task may run or wait for the panel without a heartbeat
 
 # GLOBALS
+boot_start = time.ticks_ms()
+boot_times = []    # (phase, ms since boot_start)
 start = time.ticks_ms()
-user_status = 0
-trim_value = 0
-rudder_value = 0
-main_power = 0   # power voltage of aircraft
+state = statebus.State()   # trim, rudder, power and user status, published to the tasks on every change
 trim_default = {'full_up': -100, 'neutral': 0, 'full_down': 100, 'rudder_left': -100, 'rudder_neutral': 0,
                 'rudder_right': 100}
 # settings for trim, initialized during setup (highest up, neutral, highest down)
+# and with more than 3 CAL_POINTS 'elevator_points' and 'rudder_points', lists of [raw value, percentage]
 trim_settings = {}
-display_wakeup = DISPLAY_WAKEUP
+new_points = []    # calibration points captured in setup so far
+elevator_calibration = calibration.Calibration()   # built from trim_settings
+rudder_calibration = calibration.Calibration()
 led_onboard = Pin(25, Pin.OUT)
+PROBE_SENSOR = profiler.probe('main.sensor_reader')   # one acquisition of all inputs
+power_manager = power.PowerManager(SAMPLE_MS, STABLE_MS, SLOW_SAMPLE_MS, PANEL_SLEEP_MS, LIGHTSLEEP, POWER_REPORT_MS)
+tracer = latency.Tracer(report_ms=LATENCY_REPORT_MS)   # latency from acquisition to the end of the refresh
+
+
+def boot_mark(phase):   # records and prints the time a boot phase was reached
+    t = time.ticks_diff(time.ticks_ms(), boot_start)
+    boot_times.append((phase, t))
+    print('Boot {:s}: {:d} ms'.format(phase, t))
+
+
+def build_calibration():   # tables for calc_display_percent and calc_rudder_percent, call when trim_settings changed
+    if 'elevator_points' in trim_settings:
+        elevator_calibration.build_points(trim_settings['elevator_points'])
+    else:
+        elevator_calibration.build(trim_settings['full_up'], trim_settings['neutral'], trim_settings['full_down'])
+    if 'rudder_points' in trim_settings:
+        rudder_calibration.build_points(trim_settings['rudder_points'])
+    else:
+        rudder_calibration.build(trim_settings['rudder_right'], trim_settings['rudder_neutral'],
+                                 trim_settings['rudder_left'])
 
 
 def calc_display_percent(value):
-    diff = abs(trim_settings['neutral'] - value)
-    if trim_settings['neutral'] > trim_settings['full_up']:  # full up is  lowest value
-        if trim_value <= trim_settings['neutral']:  # positive trim
-            display_percent = round(diff / (trim_settings['neutral'] - trim_settings['full_up']) * 100)
-        else:  # negative trim
-            display_percent = - round(diff / (trim_settings['full_down'] - trim_settings['neutral']) * 100)
-    else:  # full down is lowest value
-        if trim_value >= trim_settings['neutral']:  # positive trim
-            display_percent = round(diff / (trim_settings['full_up'] - trim_settings['neutral']) * 100)
-        else:  # negative trim
-            display_percent = - round(diff / (trim_settings['neutral'] - trim_settings['full_down']) * 100)
-    if display_percent > 100:
-        return 100
-    elif display_percent < -100:
-        return -100
-    return display_percent
+    return elevator_calibration.percentage(value)
 
 
 def calc_rudder_percent(value):
-    diff = abs(trim_settings['rudder_neutral'] - value)
-    if trim_settings['rudder_neutral'] > trim_settings['rudder_left']:  # left is  lowest value
-        if trim_value <= trim_settings['rudder_neutral']:
-            percent = round(diff / (trim_settings['rudder_neutral'] - trim_settings['rudder_left']) * 100)
-        else:  # negative trim
-            percent = - round(diff / (trim_settings['rudder_right'] - trim_settings['rudder_neutral']) * 100)
-    else:  # full down is lowest value
-        if trim_value >= trim_settings['rudder_neutral']:  # positive trim
-            percent = round(diff / (trim_settings['rudder_left'] - trim_settings['rudder_neutral']) * 100)
-        else:  # negative trim
-            percent = - round(diff / (trim_settings['rudder_neutral'] - trim_settings['rudder_right']) * 100)
-    if percent > 100:
-        return 100
-    elif percent < -100:
-        return -100
-    return percent
+    return rudder_calibration.percentage(value)
 
 
-async def display_driver():
-    global display_wakeup
-    global led_onboard
+async def display_presenter(d, frames, idle):
+    # sends the newest prepared frame as soon as the panel is idle, frames prepared in the meantime replace it
+    booting = True
+    task = monitor.task('display_presenter', TASK_LIMIT_MS)
+    while True:
+        monitor.park(task)
+        await frames.wait()
+        monitor.beat(task)
+        frames.clear()
+        await d.wait_idle()
+        await d.wake()
+        led_onboard.off()   # do some flicker
+        sent = d.send()
+        tracer.sent(sent)
+        led_onboard.on()
+        await d.wait_idle()
+        monitor.beat(task)
+        tracer.done(d.idle_us())
+        if booting and sent:
+            booting = False
+            boot_mark('first indication')
+            if FAST_BOOT and not DUAL_CORE:   # indicator is live, now restore the contrast
+                await d.condition()
+                boot_mark('display conditioned')
+        idle.set()   # the display driver may now clean or sleep the panel
+
 
-    old_value = 0
-    old_rudder_value = 0
+async def display_driver():
+    elevator_change = hysteresis.ChangeDetector(DEADBAND, HYSTERESIS, DWELL_MS, FAST_TRACK)
+    rudder_change = hysteresis.ChangeDetector(DEADBAND, HYSTERESIS, DWELL_MS, FAST_TRACK)
+    changes = state.subscribe()
+    frames = uasyncio.Event()   # set when a frame was prepared for the presenter
+    task = monitor.task('display_driver', TASK_LIMIT_MS)
     print('Display driver running.')
-    d = display.Display(RUDDER_TRIM)
+    if DUAL_CORE:   # display init and drawing run on core 1, d forwards the indication
+        d = dualcore.RemoteDisplay(RUDDER_TRIM)
+        await d.start()
+    else:
+        d = display.Display(RUDDER_TRIM, FAST_BOOT)
+        if FAST_BOOT:
+            await d.start()
+    boot_mark('display initialized')
+    uasyncio.create_task(display_presenter(d, frames, changes))
     await uasyncio.sleep_ms(100)  # wait for other coros to finish their measurements
     while True:
-        # print('Display driver: user status {:2d}'.format(user_status))
-        if user_status == 0 or user_status == 1:
-            display_percent = calc_display_percent(trim_value)
-            rudder_percent = calc_rudder_percent(rudder_value)
-            if display_percent != old_value or rudder_percent != old_rudder_value or display_wakeup > 0:
-                led_onboard.off()   # do some flicker
-                old_value = display_percent
-                old_rudder_value = rudder_percent
-                display_wakeup -= 1
-                d.indicator(display_percent, rudder_percent, main_power, user_status)
-                d.print()
-                led_onboard.on()
+        monitor.beat(task)
+        # frames are rendered and diffed here, also while the panel is busy with the previous one
+        # print('Display driver: user status {:2d}'.format(state.status))
+        if state.status == 0 or state.status == 1:
+            now = time.ticks_ms()
+            changed = elevator_change.update(calc_display_percent(state.trim), now)
+            if RUDDER_TRIM:
+                changed = rudder_change.update(calc_rudder_percent(state.rudder), now) or changed
             else:
-                await uasyncio.sleep_ms(50)
-        elif user_status == 2:   # setup trim full up
-            d.indicator(100, 0, main_power, user_status)
-            d.print()
-        elif user_status == 3:   # setup trim neutral
-            d.indicator(0, 0, main_power, user_status)
-            d.print()
-        elif user_status == 4:    # setup trim full down
-            d.indicator(-100, 0, main_power, user_status)
-            d.print()
-        elif user_status == 5:    # setup rudder trim full left
-            d.indicator(0, 100, main_power, user_status)
-            d.print()
-        elif user_status == 6:    # setup rudder trim neutral
-            d.indicator(0, 0, main_power, user_status)
-            d.print()
-        elif user_status == 7:    # setup rudder trim full right
-            d.indicator(0, -100, main_power, user_status)
-            d.print()
-
-        while d.busy():
-            await uasyncio.sleep_ms(50)
+                rudder_change.set(0)
+            if changed or state.wakeup > 0:
+                power_manager.activity(now)
+                force = state.wakeup > 0
+                state.wakeup = 0
+                d.indicator(elevator_change.value, rudder_change.value, state.power, state.status)
+                if d.prepare(force):
+                    tracer.prepared(state.sample, state.sample_us)   # the frame shows the latest acquisition
+                    frames.set()
+                continue
+            # sleep until the next publish, until a pending change has passed its dwell time, until the
+            # panel is idle again or until the display is due to sleep
+            due = elevator_change.remaining(now)
+            if RUDDER_TRIM and rudder_change.pending:
+                rudder_due = rudder_change.remaining(now)
+                due = rudder_due if due is None else min(due, rudder_due)
+            if due is None and not d.pending() and not d.busy() and not d.asleep():
+                if d.clean_due():   # remove ghosting while the trim is idle
+                    idle = time.ticks_diff(now, power_manager.last_activity)
+                    if idle >= CLEAN_IDLE_MS:
+                        await d.condition()
+                        continue
+                    due = CLEAN_IDLE_MS - idle
+                sleep_due = power_manager.panel_sleep_due(now)
+                if sleep_due == 0 and due is None:
+                    await d.sleep()
+                    power_manager.panel_sleeping()
+                    continue
+                if sleep_due is not None:
+                    due = sleep_due if due is None else min(due, sleep_due)
+            monitor.park(task)   # the timeout is a deadline of the driver, not a heartbeat
+            await statebus.wait(changes, due)
+        else:   # setup, the pointer shows the position of the next calibration point, +100 is full up or right
+            target = calibration.setup_percentage(state.setup_point, CAL_POINTS)
+            power_manager.activity()
+            if state.status == 2:   # setup elevator trim
+                d.indicator(target, 0, state.power, state.status)
+            else:    # setup rudder trim
+                d.indicator(0, target, state.power, state.status)
+            if d.prepare():
+                frames.set()
+            monitor.park(task)
+            await statebus.wait(changes)
 
 
 def pin_press():
-    global user_status
     global start
-    global display_wakeup
 
     # print('Long pin pressed')
-    display_wakeup = 1
+    state.wakeup = 1
 
-    if user_status == 0:
+    if state.status == 0:
         start = time.ticks_ms()  # get millisecond counter
-        user_status = 1
-    elif user_status == 1:
-        user_status = 2
+        state.status = 1
+    elif state.status == 1:
+        start_setup(2)
+    state.publish()
+
+
+def start_setup(status):   # status 2 for elevator, 5 for rudder trim
+    global new_points
+
+    state.status = status
+    state.setup_point = 0
+    new_points = []
 
 
 def pin_press_short():
-    global new_trim
-    global user_status
     global trim_settings
-    global trim_value
-    global display_wakeup
-
-    # print('Short pin pressed. User status was {:2d} trim_value {:2d}'.format(user_status, trim_value))
-    display_wakeup = 1
-    if user_status == 2:     # start setup sequence, highest trim up
-        new_trim = trim_settings.copy()  # start with old values
-        new_trim['full_up'] = trim_value
-        user_status = 3
-    elif user_status == 3:   # neutral
-        new_trim['neutral'] = trim_value
-        user_status = 4
-    elif user_status == 4:    # trim down
-        new_trim['full_down'] = trim_value
-        # set new trim values, do a sanity check, that neutral is between the two values
-        if new_trim['full_down'] > new_trim['neutral'] > new_trim['full_up'] or \
-                new_trim['full_down'] < new_trim['neutral'] < new_trim['full_up']:
-            trim_settings = new_trim.copy()
+
+    # print('Short pin pressed. User status was {:2d} trim_value {:2d}'.format(state.status, state.trim))
+    state.wakeup = 1
+    if state.status == 2 or state.status == 5:    # next calibration point of elevator or rudder trim
+        raw = state.trim if state.status == 2 else state.rudder
+        new_points.append([raw, calibration.setup_percentage(state.setup_point, CAL_POINTS)])
+        state.setup_point += 1
+        if state.setup_point < CAL_POINTS:
+            state.publish()
+            return
+        # set new trim values, do a sanity check, that the points are in order
+        if calibration.valid(new_points):
+            new_trim = trim_settings.copy()  # start with old values
+            if state.status == 2:
+                new_trim['full_up'] = new_points[0][0]
+                new_trim['neutral'] = new_points[CAL_POINTS // 2][0]
+                new_trim['full_down'] = new_points[-1][0]
+                key = 'elevator_points'
+            else:
+                new_trim['rudder_right'] = new_points[0][0]
+                new_trim['rudder_neutral'] = new_points[CAL_POINTS // 2][0]
+                new_trim['rudder_left'] = new_points[-1][0]
+                key = 'rudder_points'
+            if CAL_POINTS > 3:
+                new_trim[key] = new_points
+            elif key in new_trim:
+                del new_trim[key]
+            trim_settings = new_trim
+            monitor.section('config.save')   # writing the flash blocks the loop
             config.save(trim_settings)
+            build_calibration()
             print('Setting new trim settings: {:s}'.format(json.dumps(trim_settings)))
-        if RUDDER_TRIM:
-            user_status = 5
+        if state.status == 2 and RUDDER_TRIM:
+            start_setup(5)
         else:
-            user_status = 0
-    elif user_status == 5:     # highest right
-        new_trim['rudder_right'] = rudder_value
-        user_status = 6
-    elif user_status == 6:   # neutral
-        new_trim['rudder_neutral'] = rudder_value
-        user_status = 7
-    elif user_status == 7:    # highest left
-        new_trim['rudder_left'] = rudder_value
-        # set new trim values, do a sanity check, that neutral is between the two values
-        if new_trim['rudder_left'] > new_trim['rudder_neutral'] > new_trim['rudder_right'] or \
-                new_trim['rudder_left'] < new_trim['rudder_neutral'] < new_trim['rudder_right']:
-            trim_settings = new_trim.copy()
-            config.save(trim_settings)
-            print('Setting new trim settings: {:s}'.format(json.dumps(trim_settings)))
-        user_status = 0
-    # print('New User status {:2d}'.format(user_status))
+            state.status = 0
+    state.publish()
+    # print('New User status {:2d}'.format(state.status))
 
 
 async def user_interface():
-    global user_status
-    global start
     global led_onboard
     print('User interface running.')
 
     led_onboard.on()
-
+    changes = state.subscribe()
+    task = monitor.task('user_interface', SET_TIME_MS + TASK_LIMIT_MS)
     while True:
-        await uasyncio.sleep_ms(100)
-        if user_status == 1:   # first long press for setup was done
-            if time.ticks_diff(time.ticks_ms(), start) > SET_TIME_MS:   # you waited too long
-                print('setting user status back to 0')
-                user_status = 0
+        monitor.beat(task)
+        if state.status == 1:   # first long press for setup was done, wait for the second one
+            left = SET_TIME_MS - time.ticks_diff(time.ticks_ms(), start)
+            if left <= 0 or not await statebus.wait(changes, left):   # you waited too long
+                if state.status == 1:
+                    print('setting user status back to 0')
+                    state.status = 0
+                    state.publish()
+        else:
+            monitor.park(task)
+            await statebus.wait(changes)
 
 
 async def sensor_reader():
-    global trim_value
-    global rudder_value
-    global main_power
-
-    adc_trim = ADC(Pin(26))  # create ADC object on ADC pin
-    adc_power = ADC(Pin(27))
-    adc_rudder = ADC(Pin(28))
+    adc_trim = acquisition.Channel(26, ADC_BURST, ADC_IIR_SHIFT)  # filtered input on ADC pin
+    adc_power = acquisition.Channel(27, ADC_BURST, ADC_IIR_SHIFT)
+    adc_rudder = acquisition.Channel(28, ADC_BURST, ADC_IIR_SHIFT)
     print('Sensor reader running.')
+    task = monitor.task('sensor_reader', 4 * max(SAMPLE_MS, SLOW_SAMPLE_MS))
     while True:
-        v_trim = adc_trim.read_u16() * VOLTAGE_FACTOR    # read value, 0-65535 across voltage range 0.0v - 3.3v
-        v_rudder = adc_rudder.read_u16() * VOLTAGE_FACTOR  # read value, 0-65535 across voltage range 0.0v - 3.3v
-        v_power = adc_power.read_u16() * VOLTAGE_FACTOR  # value for power
-        trim_value = round((v_power - v_trim) * 200 / v_power) - 100  # calculates the trim position from -100% to 100%
-        rudder_value = round((v_power - v_rudder) * 200 / v_power) - 100  # calculates the trim position in %
-        main_power = v_power * (DIVIDER_R1 + DIVIDER_R2) / DIVIDER_R2
+        monitor.beat(task)
+        t = profiler.start()
+        t_sample = time.ticks_us()
+        v_trim = adc_trim.read()    # read value, 0-65535 across voltage range 0.0v - 3.3v
+        v_rudder = adc_rudder.read()  # read value, 0-65535 across voltage range 0.0v - 3.3v
+        v_power = max(adc_power.read(), 1)  # value for power
+        # trim position from -100% to 100%, in integers, rounded
+        trim_value = (200 * (v_power - v_trim) + v_power // 2) // v_power - 100
+        rudder_value = (200 * (v_power - v_rudder) + v_power // 2) // v_power - 100
+        state.power = v_power * VOLTAGE_FACTOR * (DIVIDER_R1 + DIVIDER_R2) / DIVIDER_R2
         # print('v_trim {:2f.3} v_rudder {:2f.3} v_power {:2f} trim {:2d}% rudder {:2d}% power {:2f.1}'.
-        #       format(v_trim, v_rudder, v_power, trim_value, rudder_value, main_power))
-        await uasyncio.sleep_ms(100)
+        #       format(v_trim, v_rudder, v_power, trim_value, rudder_value, state.power))
+        if trim_value != state.trim or rudder_value != state.rudder:   # the power alone does not wake the display
+            state.trim = trim_value
+            state.rudder = rudder_value
+            state.sample = tracer.sample()
+            state.sample_us = t_sample
+            state.publish()
+        profiler.stop(PROBE_SENSOR, t)
+        await power_manager.pause()   # SAMPLE_MS, longer when the indication is stable
 
 
 async def main():
@@ -255,12 +345,20 @@ async def main():
     trim_settings['rudder_left'] = configuration.get('rudder_left', trim_default['rudder_left'])
     trim_settings['rudder_neutral'] = configuration.get('rudder_neutral', trim_default['rudder_neutral'])
     trim_settings['rudder_right'] = configuration.get('rudder_right', trim_default['rudder_right'])
+    for key in ('elevator_points', 'rudder_points'):
+        if key in configuration:
+            trim_settings[key] = configuration[key]
     print('Trim settings: {:s}'.format(json.dumps(trim_settings)))
+    build_calibration()
+    boot_mark('configuration loaded')
 
+    if MONITOR_MS:   # first, so that it sees the blocking parts of the boot
+        uasyncio.create_task(monitor.run(MONITOR_MS, WDT_MS, MONITOR_REPORT_MS))
     tasks = [uasyncio.create_task(display_driver()),
              uasyncio.create_task(user_interface()),
              uasyncio.create_task(sensor_reader())]
-    button = async_button.Pushbutton(Pin(13, Pin.IN, Pin.PULL_UP))
+    button = async_button.IrqPushbutton(Pin(13, Pin.IN, Pin.PULL_UP))
+    button.heartbeat_func(monitor.beat, monitor.park, (monitor.task('buttoncheck', 20 * button.debounce_ms),))
     button.long_func(pin_press)
     button.press_func(pin_press_short)
     try:
@@ -0,0 +1,186 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+
+Monitor of the uasyncio scheduler. Blocking code, like the sleeps in EPD.reset and EPD.wait_until_idle, stops all
+other tasks. run() wakes every period_ms and measures how late it was woken, the lag. Every wake-up, beat() and
+section() is a mark, the longest time between two marks is the worst stall of the loop. It is kept together with the
+code path running at its start: the task that beat last and the section it entered since. A worst stall of about
+period_ms means that nothing blocked the loop. With the display on core 1 its sections are marks as well, the stalls
+measured on core 0 are then too short.
+Tasks register with task() and call beat() whenever they run. A task waiting for an event without a time limit
+calls park() before, it is healthy however long it waits. A task that did not beat within its limit is stalled.
+With a watchdog, run() feeds machine.WDT only as long as no task is stalled.
+
+    i = monitor.task('name', limit_ms)   # at start of the task
+    monitor.beat(i)                      # every loop
+    monitor.park(i)                      # before waiting for an event
+    monitor.section('label')             # before blocking code, up to the next beat()
+
+From the REPL or over USB serial: import monitor; monitor.report()
+"""
+
+import time
+import machine
+import uasyncio
+from micropython import const
+from array import array
+
+MAX_TASKS = const(8)
+LATE_MS = const(20)    # lag from which a wake-up counts as late
+
+_names = []
+_beat = array('L', [0] * MAX_TASKS)      # ticks_ms of the latest beat
+_limit = array('L', [0] * MAX_TASKS)     # ms a task may run or wait without a beat
+_gap = array('L', [0] * MAX_TASKS)       # longest time between two beats of an unparked task
+_stalls = array('L', [0] * MAX_TASKS)    # periods of the monitor the task was found stalled
+_parked = bytearray(MAX_TASKS)
+_running = -1      # task that beat last
+_section = None    # label of the blocking code entered by this task since its beat
+_mark = time.ticks_ms()
+wakes = 0
+late = 0           # wake-ups with a lag of LATE_MS or more
+lag_max = 0        # ms
+stall_max = 0      # ms, longest time between two marks
+stall_task = -1    # code path of stall_max
+stall_section = None
+
+
+def _observe(now):   # a mark, the code path since the previous one did not yield for long
+    global _mark, stall_max, stall_task, stall_section
+    t = time.ticks_diff(now, _mark)
+    if t > stall_max:
+        stall_max = t
+        stall_task = _running
+        stall_section = _section
+    _mark = now
+
+
+def task(name, limit_ms):   # registers the running task, returns its index for beat and park
+    global _running, _section
+    now = time.ticks_ms()
+    _observe(now)
+    if name in _names:
+        i = _names.index(name)
+    else:
+        if len(_names) == MAX_TASKS:
+            raise ValueError('monitor: more than {:d} tasks'.format(MAX_TASKS))
+        _names.append(name)
+        i = len(_names) - 1
+    _limit[i] = limit_ms
+    _beat[i] = now
+    _parked[i] = 0
+    _running = i
+    _section = None
+    return i
+
+
+def beat(i):   # task i is running
+    global _running, _section
+    now = time.ticks_ms()
+    _observe(now)
+    if not _parked[i]:
+        gap = time.ticks_diff(now, _beat[i])
+        if gap > _gap[i]:
+            _gap[i] = gap
+    _parked[i] = 0
+    _beat[i] = now
+    _running = i
+    _section = None
+
+
+def park(i):   # task i waits for an event without a time limit
+    _parked[i] = 1
+
+
+def section(label):   # the running task enters blocking code, label is a constant string
+    global _section
+    _observe(time.ticks_ms())
+    _section = label
+
+
+def path(i, label):   # name of a code path
+    name = _names[i] if i >= 0 else 'unknown'
+    return name if label is None else name + '/' + label
+
+
+def stalled(now):   # returns the index of the first stalled task, -1 if all are healthy
+    found = -1
+    for i in range(0, len(_names)):
+        if not _parked[i] and time.ticks_diff(now, _beat[i]) > _limit[i]:
+            _stalls[i] += 1
+            if found < 0:
+                found = i
+    return found
+
+
+async def run(period_ms=100, wdt_ms=0, report_ms=0):
+    # measures the lag every period_ms. With wdt_ms the watchdog resets the Pico, when the loop is blocked or a
+    # task stalled for wdt_ms. On the RP2040 wdt_ms is at most 8388
+    global wakes, late, lag_max
+    wdt = machine.WDT(timeout=wdt_ms) if wdt_ms else None
+    last_report = time.ticks_ms()
+    expected = time.ticks_add(last_report, period_ms)
+    while True:
+        await uasyncio.sleep_ms(period_ms)
+        now = time.ticks_ms()
+        _observe(now)
+        lag = time.ticks_diff(now, expected)
+        expected = time.ticks_add(now, period_ms)
+        wakes += 1
+        if lag >= LATE_MS:
+            late += 1
+        if lag > lag_max:
+            lag_max = lag
+        if stalled(now) < 0 and wdt is not None:
+            wdt.feed()
+        if report_ms and time.ticks_diff(now, last_report) >= report_ms:
+            last_report = now
+            report()
+
+
+def reset():
+    global wakes, late, lag_max, stall_max, stall_task, stall_section
+    wakes = late = lag_max = stall_max = 0
+    stall_task = -1
+    stall_section = None
+    for i in range(0, MAX_TASKS):
+        _gap[i] = 0
+        _stalls[i] = 0
+
+
+def report():
+    print('Monitor: {:d} wake-ups, {:d} late, worst lag {:d} ms, worst stall {:d} ms in {:s}'.format(
+        wakes, late, lag_max, stall_max, path(stall_task, stall_section)))
+    now = time.ticks_ms()
+    for i in range(0, len(_names)):
+        print('  {:s}: {:s}, longest gap {:d} ms, stalled {:d} times'.format(
+            _names[i], 'parked' if _parked[i] else '{:d} ms ago'.format(time.ticks_diff(now, _beat[i])),
+            _gap[i], _stalls[i]))
@@ -0,0 +1,122 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+
+Power management of the trim indicator.
+While the indication changes everything runs at full speed. When it has been stable for a while, the analog inputs
+are sampled less often, and after a longer idle period the e-paper panel is put into deep sleep. The time spent in
+each power state is accumulated and can be printed with report().
+"""
+
+import time
+import machine
+import uasyncio
+from micropython import const
+from array import array
+import monitor
+
+ACTIVE = const(0)        # indication changing, full sampling rate
+STABLE = const(1)        # indication stable, reduced sampling rate
+PANEL_SLEEP = const(2)   # panel in deep sleep, reduced sampling rate
+STATE_NAMES = ('active', 'stable', 'panel sleep')
+
+
+class PowerManager:
+    def __init__(self, sample_ms=100, stable_ms=10000, slow_sample_ms=500, panel_sleep_ms=60000,
+                 lightsleep=False, report_ms=0):
+        self.sample_ms = sample_ms            # sampling period while active
+        self.stable_ms = stable_ms            # time without activity before the sampling slows down
+        self.slow_sample_ms = slow_sample_ms  # sampling period when stable
+        self.panel_sleep_ms = panel_sleep_ms  # time without activity before the panel sleeps, 0 never
+        self.lightsleep = lightsleep          # machine.lightsleep between samples while the panel sleeps
+        self.report_ms = report_ms            # period of report(), 0 never
+        self.state = ACTIVE
+        self.since = time.ticks_ms()          # time the current state was entered
+        self.last_activity = self.since
+        self.last_report = self.since
+        self.ms = array('L', (0, 0, 0))       # accumulated time per state
+        self.lightsleep_ms = 0                # part of it spent in machine.lightsleep
+
+    def _enter(self, state, now):
+        self.ms[self.state] += time.ticks_diff(now, self.since)
+        self.since = now
+        self.state = state
+
+    def activity(self, now=None):   # call when the indication changed or a button was pressed
+        if now is None:
+            now = time.ticks_ms()
+        self.last_activity = now
+        if self.state != ACTIVE:
+            self._enter(ACTIVE, now)
+
+    def panel_sleep_due(self, now=None):   # ms until the panel should sleep, None if it never will or already does
+        if self.panel_sleep_ms == 0 or self.state == PANEL_SLEEP:
+            return None
+        if now is None:
+            now = time.ticks_ms()
+        return max(self.panel_sleep_ms - time.ticks_diff(now, self.last_activity), 0)
+
+    def panel_sleeping(self, now=None):   # call after the panel was put into deep sleep
+        self._enter(PANEL_SLEEP, time.ticks_ms() if now is None else now)
+
+    def period(self, now=None):   # time until the next acquisition, also moves from active to stable
+        if now is None:
+            now = time.ticks_ms()
+        if self.state == ACTIVE and time.ticks_diff(now, self.last_activity) >= self.stable_ms:
+            self._enter(STABLE, now)
+        if self.report_ms and time.ticks_diff(now, self.last_report) >= self.report_ms:
+            self.last_report = now
+            self.report()
+        return self.sample_ms if self.state == ACTIVE else self.slow_sample_ms
+
+    async def pause(self):   # waits until the next acquisition is due
+        ms = self.period()
+        if self.lightsleep and self.state == PANEL_SLEEP:
+            # the whole chip sleeps, nothing else is due while the panel sleeps. A button edge wakes it earlier
+            t = time.ticks_ms()
+            monitor.section('power.lightsleep')   # an intended lag of the loop
+            machine.lightsleep(ms)
+            self.lightsleep_ms += time.ticks_diff(time.ticks_ms(), t)
+            await uasyncio.sleep_ms(0)
+        else:
+            await uasyncio.sleep_ms(ms)
+
+    def times(self):   # accumulated ms per state, including the current one
+        t = list(self.ms)
+        t[self.state] += time.ticks_diff(time.ticks_ms(), self.since)
+        return t
+
+    def report(self):
+        t = self.times()
+        total = max(sum(t), 1)
+        for i in range(0, len(t)):
+            print('Power {:s}: {:d} s, {:d}%'.format(STATE_NAMES[i], t[i] // 1000, 100 * t[i] // total))
+        if self.lightsleep:
+            print('Power lightsleep: {:d} s'.format(self.lightsleep_ms // 1000))
@@ -0,0 +1,158 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+
+Optional profiling of the firmware with fixed size histograms.
+Durations are measured with ticks_us and counted in log2 buckets, bucket i holds durations from 2**(i-1) up to
+2**i - 1 us. All memory is allocated at import, start, stop and record do not allocate. With ENABLED False the
+decorators return the function unchanged and start/stop return at once.
+
+    t = profiler.start()                    # hot paths, with probe = profiler.probe('name') at import
+    ...
+    profiler.stop(probe, t)
+
+    @profiler.timed('name')                 # functions that are not called often
+    @profiler.timed_async('name')           # coroutines, the time includes waiting
+
+The wrappers of the decorators allocate the arguments of every call, and timed_async a coroutine, so they are only
+used for slow or rare calls like the blocking waits and the full refresh.
+
+From the REPL or over USB serial: import profiler; profiler.dump()
+"""
+
+import time
+from micropython import const
+from array import array
+
+ENABLED = False         # set to True to profile, must be set before the instrumented modules are imported
+MAX_PROBES = const(16)  # number of names that can be profiled
+BUCKETS = const(25)     # log2 buckets, the last one holds everything from 2**23 us = 8.4 s
+
+_names = []
+_hist = _count = _total = _max = None
+
+
+def _allocate(size):
+    global _hist, _count, _total, _max
+    _hist = array('L', [0] * (size * BUCKETS))
+    _count = array('L', [0] * size)
+    _total = array('L', [0] * size)   # us, wraps after 71 minutes of a single probe
+    _max = array('L', [0] * size)
+
+
+_allocate(MAX_PROBES if ENABLED else 0)
+
+
+def enable():   # same as ENABLED = True, call before the instrumented modules are imported
+    global ENABLED
+    if not ENABLED:
+        ENABLED = True
+        _allocate(MAX_PROBES)
+
+
+def probe(name):   # returns the index of name, registers it on first use
+    if not ENABLED:
+        return 0
+    if name in _names:
+        return _names.index(name)
+    if len(_names) == MAX_PROBES:
+        raise ValueError('profiler: more than {:d} probes'.format(MAX_PROBES))
+    _names.append(name)
+    return len(_names) - 1
+
+
+def start():
+    return time.ticks_us() if ENABLED else 0
+
+
+def stop(index, t):   # records the time since start() returned t
+    if ENABLED:
+        record(index, time.ticks_diff(time.ticks_us(), t))
+
+
+def record(index, us):
+    b = 0
+    while us >> b and b < BUCKETS - 1:
+        b += 1
+    _hist[index * BUCKETS + b] += 1
+    _count[index] += 1
+    _total[index] += us
+    if us > _max[index]:
+        _max[index] = us
+
+
+def timed(name):   # decorator for functions
+    if not ENABLED:
+        return lambda func: func
+    index = probe(name)
+
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            t = time.ticks_us()
+            result = func(*args, **kwargs)
+            record(index, time.ticks_diff(time.ticks_us(), t))
+            return result
+        return wrapper
+    return decorator
+
+
+def timed_async(name):   # decorator for coroutines
+    if not ENABLED:
+        return lambda func: func
+    index = probe(name)
+
+    def decorator(func):
+        async def wrapper(*args, **kwargs):
+            t = time.ticks_us()
+            result = await func(*args, **kwargs)
+            record(index, time.ticks_diff(time.ticks_us(), t))
+            return result
+        return wrapper
+    return decorator
+
+
+def reset():
+    for a in (_hist, _count, _total, _max):
+        for i in range(0, len(a)):
+            a[i] = 0
+
+
+def dump():   # prints count, mean, max and the non empty buckets of each probe
+    if not ENABLED:
+        print('Profiler disabled, set ENABLED in profiler.py')
+        return
+    for i in range(0, len(_names)):
+        n = _count[i]
+        print('{:s}: {:d} calls, mean {:d} us, max {:d} us, total {:d} ms'.format(
+            _names[i], n, _total[i] // n if n else 0, _max[i], _total[i] // 1000))
+        for b in range(0, BUCKETS):
+            c = _hist[i * BUCKETS + b]
+            if c:
+                print('  < {:9d} us: {:d}'.format(1 << b, c))
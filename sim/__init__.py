@@ -0,0 +1,69 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Host simulation runtime for the trim indicator firmware.
+
+The firmware is written for MicroPython on the Pi Pico. This package provides stand-ins for the
+MicroPython specific modules (machine, framebuf, micropython, uasyncio and the ticks functions of time)
+so that the unmodified main.py, display.py and epaper1in54.py can be run with CPython on a PC.
+
+    import sim
+    sim.install()          # must be called before importing any firmware module
+    import main
+
+With sim.install(virtual=True) the simulated time jumps from timer to timer, see sim.clock.
+"""
+
+import asyncio
+import os
+import sys
+
+from sim import clock
+
+LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+installed = False
+
+
+def install(speed=1.0, virtual=False):
+    # make the stand-in modules importable under their MicroPython names and patch time
+    global installed
+    clock.set_virtual(virtual)
+    clock.set_speed(speed)
+    if installed:
+        return
+    if LIB not in sys.path:
+        sys.path.insert(0, LIB)
+    if ROOT not in sys.path:
+        sys.path.insert(1, ROOT)
+    clock.patch_time()
+    asyncio.set_event_loop_policy(clock.VirtualEventLoopPolicy())
+    installed = True
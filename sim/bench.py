@@ -0,0 +1,207 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+
+Benchmark of the display pipeline with recorded trim traces.
+Each trace of sim/traces is replayed through the unmodified firmware on the virtual clock of the simulation, which
+makes the SPI bytes, the number of refreshs and the latency traced by latency.Tracer in the firmware (from the
+acquisition to the end of the refresh showing it) repeatable. The frames rendered during the trace are then
+rendered again REPEAT times in a row to measure the host time of Display.indicator, Display.text and of a frame
+(render, diff and send).
+The results are compared with a stored baseline:
+
+    python -m sim.bench                       # run and compare with sim/bench_baseline.json
+    python -m sim.bench --save                # run and store the simulated results as new baseline
+    python -m sim.bench taxi climb
+
+Host times are measured with CPython and are only comparable on the same PC, they are printed for information.
+Only with --host they are stored with --save and count as regressions, for a baseline kept on one PC:
+
+    python -m sim.bench --host --baseline my_pc.json --save
+
+On the virtual clock computing takes no simulated time, so the latency does not include the render time.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import sim
+from sim import run
+
+TRACES = ('taxi', 'climb', 'cruise')
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+REPEAT = 20           # render passes over the frames of a trace, the fastest time of each frame counts
+TEXTS = (('Trim', 5, 5, 24), ('Ind', 17, 32, 24), ('V', 78, 92, 16))   # Display.text calls of the background
+# metric, unit, True if measured in host time. For all of them a higher value is worse
+METRICS = (('refreshes', '', False), ('spi_bytes', 'B', False), ('render_us', 'us', True),
+           ('render_p95_us', 'us', True), ('text_us', 'us', True), ('frame_us', 'us', True),
+           ('latency_p50_ms', 'ms', False), ('latency_p95_ms', 'ms', False), ('latency_max_ms', 'ms', False),
+           ('dropped', '', False))
+
+
+def percentile(values, p):   # nearest rank percentile of a list, 0 for an empty one
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, (len(values) * p + 99) // 100 - 1))]
+
+
+def mean(values):
+    return sum(values) // len(values) if values else 0
+
+
+def render_times(frames):
+    # renders the indicator arguments of frames REPEAT times, returns the fastest indicator and frame time of
+    # each frame in us and the fastest time of Display.text for the texts of the background
+    import display
+    d = display.Display(False)
+    render = [None] * len(frames)
+    frame = [None] * len(frames)
+    for _ in range(REPEAT):
+        for i, args in enumerate(frames):
+            t0 = time.perf_counter_ns()
+            d.indicator(*args)
+            t1 = time.perf_counter_ns()
+            if d.prepare():
+                d.send()
+            t2 = time.perf_counter_ns()
+            render[i] = min(render[i] or t1 - t0, t1 - t0)
+            frame[i] = min(frame[i] or t2 - t0, t2 - t0)
+    text = None
+    for _ in range(REPEAT):
+        t = time.perf_counter_ns()
+        for args in TEXTS:
+            d.text(*args)
+        t = (time.perf_counter_ns() - t) // len(TEXTS)
+        text = t if text is None else min(text, t)
+    return [t // 1000 for t in render], [t // 1000 for t in frame], text // 1000
+
+
+def bench(name):   # replays one trace, returns its metrics
+    trace = run.Trace.load(os.path.join(TRACE_DIR, name + '.json'))
+    frames = []      # arguments of Display.indicator
+    firmware = {}
+    originals = {}   # methods of display.Display replaced during the trace
+
+    def on_start(main, panel):
+        import display
+        firmware['main'] = main
+        originals.update(indicator=display.Display.indicator)
+        indicator = display.Display.indicator
+
+        def recorded_indicator(self, *args):
+            frames.append(args)
+            indicator(self, *args)
+        display.Display.indicator = recorded_indicator
+
+    p = run.simulate(trace, on_start=on_start, virtual=True)
+    import display
+    for method, func in originals.items():
+        setattr(display.Display, method, func)
+    tracer = firmware['main'].tracer   # latency from the acquisition to the end of its refresh
+    latency = [us // 1000 for us in tracer.kept()]
+    refreshes = len(p.frames)
+    spi_bytes = p.bytes_sent
+    render, frame, text_us = render_times(frames)
+    return {'refreshes': refreshes, 'spi_bytes': spi_bytes,
+            'render_us': mean(render), 'render_p95_us': percentile(render, 95), 'text_us': text_us,
+            'frame_us': mean(frame),
+            'latency_p50_ms': percentile(latency, 50), 'latency_p95_ms': percentile(latency, 95),
+            'latency_max_ms': max(latency) if latency else 0, 'dropped': tracer.dropped}
+
+
+def compare(results, baseline, tolerance, host_tolerance=None):
+    # prints the results, returns the number of regressions. Host times only count with a host_tolerance
+    regressions = 0
+    for name, metrics in results.items():
+        base = baseline.get(name, {})
+        print('{:s}'.format(name))
+        for key, unit, host in METRICS:
+            value = metrics[key]
+            line = '  {:16s}{:>10d} {:2s}'.format(key, value, unit)
+            if key in base:
+                b = base[key]
+                change = (value - b) * 100 // b if b else 0
+                if host:
+                    worse = host_tolerance is not None and change > host_tolerance
+                else:
+                    worse = change > tolerance
+                regressions += worse
+                line += '  baseline {:>10d}  {:+4d}%{:s}'.format(b, change, '  REGRESSION' if worse else '')
+            elif host:
+                line += '  host time, not compared'
+            print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the display pipeline with recorded trim traces.')
+    parser.add_argument('traces', nargs='*', default=TRACES, help='names of traces in sim/traces')
+    parser.add_argument('--baseline', default=BASELINE, help='JSON file with the baseline results')
+    parser.add_argument('--tolerance', type=int, default=5, help='percent a simulated metric may get worse')
+    parser.add_argument('--host', action='store_true', help='store and compare the host times as well')
+    parser.add_argument('--host-tolerance', type=int, default=50, help='percent a host time may get worse, with --host')
+    parser.add_argument('--save', action='store_true', help='store the results as new baseline')
+    args = parser.parse_args()
+
+    sim.install(virtual=True)
+    results = {}
+    stdout = sys.stdout
+    for name in args.traces:
+        sys.stdout = open(os.devnull, 'w')   # the firmware prints its boot messages
+        try:
+            results[name] = bench(name)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.host_tolerance if args.host else None)
+    if args.save:
+        for name, metrics in results.items():   # host times of this PC do not belong into a shared baseline
+            baseline[name] = {key: metrics[key] for key, unit, host in METRICS if args.host or not host}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+            f.write('\n')
+        print('Baseline saved to {:s}'.format(args.baseline))
+    elif regressions:
+        print('{:d} regressions'.format(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
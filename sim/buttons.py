@@ -0,0 +1,97 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+
+Comparison of async_button.IrqPushbutton with the polling async_button.Pushbutton.
+Both classes are driven on the virtual clock by the same press patterns on a simulated pin, with and without
+suppress. The callbacks each of them runs, and the simulated time they run at, have to be the same:
+
+    python -m sim.buttons
+"""
+
+import asyncio
+import sys
+
+import sim
+
+PIN = 5
+# press patterns, a list of (pin level, ms), the button is active low
+PATTERNS = {
+    'short': ((0, 100), (1, 1000)),
+    'long': ((0, 1500), (1, 1000)),
+    'double': ((0, 100), (1, 100), (0, 100), (1, 1000)),
+    'long double': ((0, 100), (1, 100), (0, 1500), (1, 1000)),
+    'bouncing': ((0, 5), (1, 5), (0, 5), (1, 5), (0, 200), (1, 5), (0, 5), (1, 1000)),
+    'two shorts': ((0, 100), (1, 600), (0, 100), (1, 1000)),
+}
+
+
+def callbacks(cls, suppress, pattern):   # returns the (callback, ms) the button ran during the pattern
+    sim.install(virtual=True)
+    from sim import clock
+    import machine
+    machine.reset_state()
+    log = []
+
+    async def drive():
+        machine.set_input(PIN, 1)
+        button = cls(machine.Pin(PIN, machine.Pin.IN), suppress)
+        for name in ('press', 'release', 'double', 'long'):
+            getattr(button, name + '_func')(lambda name=name: log.append((name, clock.now_ms())))
+        await asyncio.sleep(0.1)
+        for level, ms in pattern:
+            machine.set_input(PIN, level)
+            await asyncio.sleep(ms / 1000)
+    asyncio.run(drive())
+    return log
+
+
+def main():
+    sim.install(virtual=True)
+    import async_button
+    differences = 0
+    for suppress in (False, True):
+        for name, pattern in PATTERNS.items():
+            polled = callbacks(async_button.Pushbutton, suppress, pattern)
+            irq = callbacks(async_button.IrqPushbutton, suppress, pattern)
+            same = polled == irq
+            print('{:12s} suppress {:5s} {:s} {:s}'.format(name, str(suppress), 'OK  ' if same else 'DIFF',
+                                                           ' '.join(c for c, t in polled)))
+            if not same:
+                print('  Pushbutton    {}'.format(polled))
+                print('  IrqPushbutton {}'.format(irq))
+                differences += 1
+    if differences:
+        print('{:d} differences'.format(differences))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
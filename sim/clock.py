@@ -0,0 +1,164 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Simulated clock. All firmware timing (ticks_ms, sleep_ms, uasyncio sleeps) runs on this clock.
+With speed > 1 the simulation runs faster than real time, e.g. speed=4 runs 4 simulated seconds per second.
+A virtual clock only advances when every task sleeps, it jumps to the next timer. Runs are then repeatable and
+as fast as the host allows, but computing takes no simulated time. Threads are not supported with it.
+"""
+
+import asyncio
+import math
+import selectors
+import time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+_speed = 1.0
+_t0 = time.perf_counter()
+_sleep = time.sleep
+_virtual_us = None   # simulated time of the virtual clock, None while the clock follows real time
+
+
+def set_speed(speed):
+    global _speed, _t0, _virtual_us
+    _speed = float(speed)
+    _t0 = time.perf_counter()
+    if _virtual_us is not None:
+        _virtual_us = 0
+
+
+def set_virtual(virtual):   # switches between the virtual clock and scaled real time, restarts at 0
+    global _virtual_us, _t0
+    _virtual_us = 0 if virtual else None
+    _t0 = time.perf_counter()
+
+
+def virtual():
+    return _virtual_us is not None
+
+
+def advance_us(us):   # moves the virtual clock forward
+    global _virtual_us
+    _virtual_us += int(us)
+
+
+def speed():
+    return _speed
+
+
+def now_us():   # simulated microseconds since set_speed
+    if _virtual_us is not None:
+        return _virtual_us
+    return int((time.perf_counter() - _t0) * 1000000 * _speed)
+
+
+def now_ms():
+    return now_us() // 1000
+
+
+def to_real(seconds):   # converts a simulated duration into seconds of the event loop
+    if _virtual_us is not None:
+        return seconds   # the virtual event loop runs on simulated time
+    return seconds / _speed
+
+
+def ticks_ms():
+    return now_ms() & TICKS_MAX
+
+
+def ticks_us():
+    return now_us() & TICKS_MAX
+
+
+def ticks_cpu():
+    return ticks_us()
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+def sleep_ms(ms):
+    sleep(ms / 1000)
+
+
+def sleep_us(us):
+    sleep(us / 1000000)
+
+
+def sleep(seconds):
+    if seconds <= 0:
+        return
+    if _virtual_us is not None:
+        advance_us(seconds * 1000000)
+    else:
+        _sleep(to_real(seconds))
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    # instead of waiting for the next timer, the virtual clock jumps to it
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None or _virtual_us is None:
+            return super().select(timeout)
+        advance_us(math.ceil(timeout * 1000000))   # rounded up, so that the timer is due afterwards
+        return []
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):   # asyncio event loop on the virtual clock
+    def __init__(self):
+        super().__init__(_VirtualSelector())
+
+    def time(self):
+        return now_us() / 1000000
+
+
+class VirtualEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def new_event_loop(self):
+        return VirtualEventLoop() if _virtual_us is not None else super().new_event_loop()
+
+
+def patch_time():   # adds the MicroPython time functions to the CPython time module
+    time.ticks_ms = ticks_ms
+    time.ticks_us = ticks_us
+    time.ticks_cpu = ticks_cpu
+    time.ticks_add = ticks_add
+    time.ticks_diff = ticks_diff
+    time.sleep_ms = sleep_ms
+    time.sleep_us = sleep_us
@@ -0,0 +1,118 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Host stand-in for the MicroPython framebuf module, used by the simulation runtime.
+Only MONO_HLSB is implemented, which is the format used by display.py.
+"""
+
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+
+class FrameBuffer:
+    def __init__(self, buf, width, height, format=MONO_HLSB, stride=None):
+        if format != MONO_HLSB:
+            raise ValueError('sim framebuf only supports MONO_HLSB')
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.stride = stride if stride is not None else width
+        self.row = (self.stride + 7) // 8
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        i = y * self.row + (x >> 3)
+        bit = 0x80 >> (x & 7)
+        if c is None:
+            return 1 if self.buf[i] & bit else 0
+        if c:
+            self.buf[i] |= bit
+        else:
+            self.buf[i] &= ~bit & 0xFF
+
+    def fill(self, c):
+        n = self.row * self.height
+        self.buf[0:n] = (b'\xff' if c else b'\x00') * n
+
+    def fill_rect(self, x, y, w, h, c):
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        if x0 >= x1:
+            return
+        b0 = (x0 + 7) >> 3   # whole bytes inside the rectangle are set at once
+        b1 = x1 >> 3
+        full = (b'\xff' if c else b'\x00') * max(b1 - b0, 0)
+        for yy in range(y0, y1):
+            if b0 < b1:
+                base = yy * self.row
+                self.buf[base + b0:base + b1] = full
+                for xx in range(x0, b0 << 3):
+                    self.pixel(xx, yy, c)
+                for xx in range(b1 << 3, x1):
+                    self.pixel(xx, yy, c)
+            else:
+                for xx in range(x0, x1):
+                    self.pixel(xx, yy, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        for sy in range(fbuf.height):
+            dy = y + sy
+            if not 0 <= dy < self.height:
+                continue
+            for sx in range(fbuf.width):
+                dx = x + sx
+                if not 0 <= dx < self.width:
+                    continue
+                c = fbuf.pixel(sx, sy)
+                if c != key:
+                    self.pixel(dx, dy, c)
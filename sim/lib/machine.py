@@ -0,0 +1,230 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Host stand-in for the MicroPython machine module, used by the simulation runtime.
+Pins are shared by number, so that the simulated panel and the scripted inputs see the same levels
+as the firmware. ADC values come from a source function installed by the runner.
+"""
+
+from sim import clock
+
+_levels = {}       # pin id -> level driven by the firmware or by the simulation
+_inputs = {}       # pin id -> function returning the level of an input driven by the simulation
+_irqs = {}         # pin id -> (handler, trigger, pin)
+_listeners = {}    # pin id -> list of functions called with the new level when the firmware drives a pin
+_spi_devices = {}  # spi id -> object with write(buf)
+_adc_source = None  # function(pin id) -> 16 bit value
+_irq_scheduler = None  # function(callback) used to deliver pin interrupts, default is a direct call
+
+lightsleep_ms = 0  # accumulated time spent in machine.lightsleep
+
+
+def _pin_id(pin):
+    return pin.id if isinstance(pin, Pin) else pin
+
+
+def attach_input(pin_id, func):   # level of pin_id is given by func() from now on
+    _inputs[pin_id] = func
+
+
+def set_input(pin_id, level):   # drives an input pin and delivers the matching interrupt
+    old = Pin(pin_id).value()
+    _inputs[pin_id] = lambda: level
+    edge(pin_id, old, level)
+
+
+def edge(pin_id, old, new):   # reports a level change of a simulated input
+    if old == new or pin_id not in _irqs:
+        return
+    handler, trigger, pin = _irqs[pin_id]
+    if (new == 0 and trigger & Pin.IRQ_FALLING) or (new == 1 and trigger & Pin.IRQ_RISING):
+        if _irq_scheduler is None:
+            handler(pin)
+        else:
+            _irq_scheduler(lambda: handler(pin))
+
+
+def listen(pin_id, func):
+    _listeners.setdefault(pin_id, []).append(func)
+
+
+def attach_spi(spi_id, device):
+    _spi_devices[spi_id] = device
+
+
+def set_adc_source(func):
+    global _adc_source
+    _adc_source = func
+
+
+def set_irq_scheduler(func):
+    global _irq_scheduler
+    _irq_scheduler = func
+
+
+def reset_state():
+    global _adc_source, _irq_scheduler, lightsleep_ms
+    _levels.clear()
+    _inputs.clear()
+    _irqs.clear()
+    _listeners.clear()
+    _spi_devices.clear()
+    _adc_source = None
+    _irq_scheduler = None
+    lightsleep_ms = 0
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.init(mode, pull, value=value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if pull == Pin.PULL_UP and self.id not in _inputs and self.id not in _levels:
+            _levels[self.id] = 1
+        if value is not None:
+            self._drive(value)
+
+    def _drive(self, value):
+        value = 1 if value else 0
+        old = _levels.get(self.id)
+        _levels[self.id] = value
+        if old != value:
+            for func in _listeners.get(self.id, ()):
+                func(value)
+
+    def value(self, v=None):
+        if v is None:
+            if self.id in _inputs:
+                return 1 if _inputs[self.id]() else 0
+            return _levels.get(self.id, 0)
+        self._drive(v)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self._drive(1)
+
+    def off(self):
+        self._drive(0)
+
+    def toggle(self):
+        self._drive(not self.value())
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        if handler is None:
+            _irqs.pop(self.id, None)
+        else:
+            _irqs[self.id] = (handler, trigger, self)
+
+    def __repr__(self):
+        return 'Pin({})'.format(self.id)
+
+
+class ADC:
+    CORE_TEMP = 4
+
+    def __init__(self, pin):
+        self.id = _pin_id(pin)
+
+    def read_u16(self):
+        if _adc_source is None:
+            return 0
+        return max(0, min(65535, int(_adc_source(self.id))))
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id, baudrate=1000000, polarity=0, phase=0, bits=8, firstbit=MSB, sck=None, mosi=None,
+                 miso=None):
+        self.id = id
+        self.baudrate = baudrate
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def write(self, buf):
+        device = _spi_devices.get(self.id)
+        if device is not None:
+            device.write(buf)
+
+    def read(self, nbytes, write=0x00):
+        return bytes(nbytes)
+
+    def deinit(self):
+        pass
+
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        self.timeout = timeout
+        self.last_feed = clock.ticks_ms()
+        self.feeds = 0
+
+    def feed(self):
+        self.last_feed = clock.ticks_ms()
+        self.feeds += 1
+
+
+def lightsleep(time_ms=None):
+    global lightsleep_ms
+    if time_ms:
+        clock.sleep_ms(time_ms)
+        lightsleep_ms += time_ms
+
+
+def deepsleep(time_ms=None):
+    raise SystemExit('machine.deepsleep called')
+
+
+def freq(hz=None):
+    return 125000000
+
+
+def reset():
+    raise SystemExit('machine.reset called')
+
+
+def unique_id():
+    return b'\x00sim\x00\x00\x00\x00'
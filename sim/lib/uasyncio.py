@@ -0,0 +1,101 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Host stand-in for MicroPython uasyncio on top of CPython asyncio, used by the simulation runtime.
+All sleeps and timeouts run on the simulated clock of sim.clock.
+"""
+
+import asyncio
+from asyncio import CancelledError, Event, Lock, create_task, gather, run, current_task  # noqa: F401
+
+from sim import clock
+
+TimeoutError = asyncio.TimeoutError
+
+
+def sleep(t):
+    return asyncio.sleep(clock.to_real(t))
+
+
+def sleep_ms(t):
+    return asyncio.sleep(clock.to_real(t / 1000))
+
+
+def wait_for(aw, timeout):
+    return asyncio.wait_for(aw, None if timeout is None else clock.to_real(timeout))
+
+
+def wait_for_ms(aw, timeout):
+    return asyncio.wait_for(aw, None if timeout is None else clock.to_real(timeout / 1000))
+
+
+def get_event_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.new_event_loop()
+
+
+def new_event_loop():
+    return asyncio.new_event_loop()
+
+
+class ThreadSafeFlag:   # may be set from interrupt handlers or other threads
+    def __init__(self):
+        self._event = asyncio.Event()
+        self._loop = None
+
+    def set(self):
+        loop = self._loop
+        if loop is None:
+            try:
+                self._loop = loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+        if loop is None:
+            self._event.set()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._event.set()
+        else:
+            loop.call_soon_threadsafe(self._event.set)
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        await self._event.wait()
+        self._event.clear()
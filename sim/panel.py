@@ -0,0 +1,229 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Model of the Waveshare 1.54 inch e-paper panel (SSD1681 controller) as seen over SPI.
+
+The model decodes the command stream sent by epaper1in54.EPD, keeps the display RAM, drives the busy pin
+for the duration of each update and captures a frame every time an update is activated.
+"""
+
+import machine
+from sim import clock
+
+WIDTH = 200
+HEIGHT = 200
+ROW_BYTES = WIDTH // 8
+
+# simulated duration of busy after MASTER_ACTIVATION, by value of DISPLAY_UPDATE_CONTROL_2
+UPDATE_MS = {0xC7: 2000, 0xF7: 2000, 0xFF: 300, 0xCF: 300, 0xB1: 100, 0xC0: 10}
+DEFAULT_UPDATE_MS = 300
+FRAME_MS = 20   # duration of one waveform frame, refreshs with a loaded LUT last as long as its phases
+RESET_MS = 10
+REFRESH_MODES = (0xC7, 0xF7, 0xFF, 0xCF)   # update control values that change the image
+
+
+def lut_frames(lut):   # number of frames of the waveform in a 153 byte LUT
+    n = 0
+    for g in range(12):
+        tp = lut[60 + 7 * g: 67 + 7 * g]
+        n += (tp[0] + tp[1] + tp[3] + tp[4]) * (tp[6] + 1)
+    return n
+
+
+class Frame:
+    def __init__(self, t_ms, mode, ram, lut):
+        self.t_ms = t_ms     # simulated time of activation
+        self.mode = mode     # value of DISPLAY_UPDATE_CONTROL_2
+        self.ram = ram       # image shown, HEIGHT rows of ROW_BYTES in framebuffer order
+        self.lut = lut       # bytes of the waveform LUT in use, or None
+        self.done_ms = None  # simulated time at which busy dropped
+
+    def pixel(self, x, y):   # 1 is white, 0 is black
+        return (self.ram[y * ROW_BYTES + (x >> 3)] >> (7 - (x & 7))) & 1
+
+    def pbm(self):   # image as binary portable bitmap, PBM uses 1 for black
+        return b'P4\n%d %d\n' % (WIDTH, HEIGHT) + bytes(b ^ 0xFF for b in self.ram)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.pbm())
+
+
+class Panel:
+    def __init__(self, spi_id=1, cs=6, dc=7, rst=9, busy=12):
+        self.cs = cs
+        self.dc = dc
+        self.busy_pin = busy
+        self.ram = bytearray(b'\xff' * (ROW_BYTES * HEIGHT))   # indexed by RAM address y * ROW_BYTES + x
+        self.frames = []
+        self.on_frame = None       # optional function(frame) called on each image update
+        self.bytes_sent = 0        # all bytes received over SPI
+        self.ram_bytes = 0         # bytes written into display RAM
+        self.commands = 0
+        self.busy_ms = 0           # accumulated simulated time with busy high
+        self.sleeping = False
+        self.sleep_count = 0
+        self.lut = None
+        self.update_control = 0xFF
+        self._cmd = None
+        self._params = bytearray()
+        self._defaults()
+        self._busy_until = 0
+        self._busy_timer = None
+        machine.attach_spi(spi_id, self)
+        machine.attach_input(busy, self.busy)
+        machine.listen(rst, self._reset_pin)
+
+    def _defaults(self):   # register values after hardware or software reset
+        self._entry_mode = 0x03        # x and y increment
+        self._scan_reversed = False    # TB bit of DRIVER_OUTPUT_CONTROL
+        self._x_start, self._x_end = 0, ROW_BYTES - 1
+        self._y_start, self._y_end = 0, HEIGHT - 1
+        self._x, self._y = 0, 0
+        self.lut = None                # back to the waveform in OTP
+
+    def image(self):   # RAM in framebuffer order, row 0 is the top of the panel
+        if not self._scan_reversed:
+            return bytes(self.ram)
+        rows = [self.ram[y * ROW_BYTES:(y + 1) * ROW_BYTES] for y in range(HEIGHT - 1, -1, -1)]
+        return b''.join(rows)
+
+    # busy pin
+    def busy(self):   # like the controller, busy stays high during deep sleep
+        return 1 if self.sleeping or clock.now_ms() < self._busy_until else 0
+
+    def _start_busy(self, ms, frame=None):
+        now = clock.now_ms()
+        self._busy_until = now + ms
+        self.busy_ms += ms
+        delay = clock.to_real(ms / 1000)
+        try:
+            import asyncio
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if frame is not None:
+            frame.done_ms = self._busy_until
+        if loop is not None:
+            if self._busy_timer is not None:
+                self._busy_timer.cancel()
+            self._busy_timer = loop.call_later(delay, self._busy_dropped)
+
+    def _busy_dropped(self):
+        self._busy_timer = None
+        machine.edge(self.busy_pin, 1, 0)
+
+    def _reset_pin(self, level):
+        if level == 0:   # hardware reset, wakes from deep sleep
+            self.sleeping = False
+            self._cmd = None
+            self._defaults()
+        else:
+            self._start_busy(RESET_MS)
+
+    # spi
+    def write(self, buf):
+        if machine.Pin(self.cs).value():
+            return   # not selected
+        buf = bytes(buf)
+        self.bytes_sent += len(buf)
+        if self.sleeping:
+            return
+        if machine.Pin(self.dc).value() == 0:
+            for b in buf:
+                self._command(b)
+        else:
+            if self._cmd == 0x24:
+                self._write_ram(buf)
+            elif self._cmd is not None:
+                self._params.extend(buf)
+                self._parameters()
+
+    def _command(self, cmd):
+        self.commands += 1
+        self._cmd = cmd
+        self._params = bytearray()
+        if cmd == 0x20:
+            self._activate()
+        elif cmd == 0x12:
+            self._defaults()
+            self._start_busy(RESET_MS)
+
+    def _parameters(self):
+        p = self._params
+        cmd = self._cmd
+        if cmd == 0x01 and len(p) == 3:
+            self._scan_reversed = bool(p[2] & 0x01)
+        elif cmd == 0x11 and len(p) == 1:
+            self._entry_mode = p[0]
+        elif cmd == 0x44 and len(p) == 2:
+            self._x_start, self._x_end = p[0], p[1]
+        elif cmd == 0x45 and len(p) == 4:
+            self._y_start, self._y_end = p[0] | p[1] << 8, p[2] | p[3] << 8
+        elif cmd == 0x4E and len(p) == 1:
+            self._x = p[0]
+        elif cmd == 0x4F and len(p) == 2:
+            self._y = p[0] | p[1] << 8
+        elif cmd == 0x22 and len(p) == 1:
+            self.update_control = p[0]
+        elif cmd == 0x32 and len(p) == 153:
+            self.lut = bytes(p)
+        elif cmd == 0x10 and len(p) == 1 and p[0] & 0x03:
+            self.sleeping = True
+            self.sleep_count += 1
+
+    def _write_ram(self, buf):
+        x_inc = self._entry_mode & 0x01
+        y_inc = self._entry_mode & 0x02
+        for b in buf:
+            if 0 <= self._x < ROW_BYTES and 0 <= self._y < HEIGHT:
+                self.ram[self._y * ROW_BYTES + self._x] = b
+            self.ram_bytes += 1
+            if self._x == self._x_end:
+                self._x = self._x_start
+                if self._y == self._y_end:
+                    self._y = self._y_start
+                else:
+                    self._y += 1 if y_inc else -1
+            else:
+                self._x += 1 if x_inc else -1
+
+    def _activate(self):
+        mode = self.update_control
+        ms = UPDATE_MS.get(mode, DEFAULT_UPDATE_MS)
+        if mode in REFRESH_MODES and self.lut is not None:
+            ms = lut_frames(self.lut) * FRAME_MS
+        frame = None
+        if mode in REFRESH_MODES:
+            frame = Frame(clock.now_ms(), mode, self.image(), self.lut)
+            self.frames.append(frame)
+        self._start_busy(ms, frame)
+        if frame is not None and self.on_frame is not None:
+            self.on_frame(frame)
@@ -0,0 +1,178 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+Runs the unmodified firmware (main.main) on the simulation runtime.
+
+The analog inputs and the push button follow a trace, every image update the panel receives is captured and can
+be written as a PBM file. A trace is a JSON file:
+
+    {
+        "seconds": 60,                           # simulated duration
+        "adc": {"26": [[0, 30000], [5000, 32000]], "27": [[0, 40000]], "28": [[0, 20000]]},
+        "button": [[12000, 1500]],               # presses as [start ms, duration ms]
+        "config": {"full_up": -60, ...},         # optional content of etc/trim_config.json
+        "settings": {"RUDDER_TRIM": true}        # optional constants of main.py to change
+    }
+
+ADC values are 16 bit, between two points of a pin they are interpolated linearly. Pin 26 is the elevator trim,
+27 the main power and 28 the rudder trim.
+
+    python -m sim.run trace.json --speed 10 --frames out/
+    python -m sim.run trace.json --virtual --profile    # prints the profiler histograms after the run
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+import sim
+
+FIRMWARE = ('main', 'display', 'epaper1in54', 'font8x8', 'async_button', 'config', 'acquisition', 'hysteresis',
+            'calibration', 'dualcore', 'statebus', 'power', 'ghosting', 'latency', 'monitor')
+# profiler is not reloaded, profiler.enable() before simulate() has to stay in effect
+BUTTON_PIN = 13
+
+
+class Trace:
+    def __init__(self, data):
+        self.seconds = data.get('seconds', 30)
+        self.adc = {int(pin): sorted(points) for pin, points in data.get('adc', {}).items()}
+        self.button = data.get('button', [])
+        self.config = data.get('config')
+        self.settings = data.get('settings', {})
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def value(self, pin, t_ms):   # ADC value of pin at simulated time t_ms
+        points = self.adc.get(pin)
+        if not points:
+            return 0
+        if t_ms <= points[0][0]:
+            return points[0][1]
+        for (t0, v0), (t1, v1) in zip(points, points[1:]):
+            if t_ms < t1:
+                return v0 + (v1 - v0) * (t_ms - t0) // (t1 - t0)
+        return points[-1][1]
+
+
+def load_firmware():   # imports a fresh copy of the firmware modules, so that several runs start alike
+    for name in FIRMWARE:
+        sys.modules.pop(name, None)
+    import main
+    return main
+
+
+async def _press_button(machine, clock, start_ms, duration_ms):
+    await asyncio.sleep(clock.to_real(start_ms / 1000))
+    machine.set_input(BUTTON_PIN, 0)
+    await asyncio.sleep(clock.to_real(duration_ms / 1000))
+    machine.set_input(BUTTON_PIN, 1)
+
+
+def simulate(trace, speed=10.0, frames_dir=None, workdir=None, on_start=None, virtual=False):
+    # runs main.main() for trace.seconds of simulated time, returns the panel with the captured frames.
+    # on_start(main, panel) is called after the firmware is imported and before it runs.
+    # With virtual the simulated time jumps from timer to timer and speed has no effect
+    sim.install(speed, virtual)
+    from sim import clock, panel
+    import machine
+    machine.reset_state()
+    p = panel.Panel()
+    machine.set_adc_source(lambda pin: trace.value(pin, clock.now_ms()))
+    machine.set_input(BUTTON_PIN, 1)
+    if frames_dir:
+        os.makedirs(frames_dir, exist_ok=True)
+
+        def save(frame):
+            frame.save(os.path.join(frames_dir, 'frame_{:04d}.pbm'.format(len(p.frames))))
+        p.on_frame = save
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(workdir or tmp)   # config.py keeps its file relative to the working directory
+        try:
+            if trace.config is not None:
+                os.makedirs('etc', exist_ok=True)
+                with open('etc/trim_config.json', 'w') as f:
+                    json.dump(trace.config, f)
+            main = load_firmware()
+            clock.set_speed(speed)   # start the simulated time with the firmware
+            for name, value in trace.settings.items():
+                setattr(main, name, value)
+            if on_start is not None:
+                on_start(main, p)
+
+            async def run():
+                for start_ms, duration_ms in trace.button:
+                    asyncio.create_task(_press_button(machine, clock, start_ms, duration_ms))
+                try:
+                    await asyncio.wait_for(main.main(), clock.to_real(trace.seconds))
+                except asyncio.TimeoutError:
+                    pass
+            asyncio.run(run())
+        finally:
+            os.chdir(cwd)
+    return p
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the trim indicator firmware on the host.')
+    parser.add_argument('trace', help='JSON trace of analog inputs and button presses')
+    parser.add_argument('--speed', type=float, default=10.0, help='simulated seconds per real second')
+    parser.add_argument('--seconds', type=float, help='simulated duration, overrides the trace')
+    parser.add_argument('--frames', help='directory for the captured frames as PBM files')
+    parser.add_argument('--virtual', action='store_true', help='jump from timer to timer, repeatable results')
+    parser.add_argument('--profile', action='store_true', help='enable the profiler and print it after the run')
+    args = parser.parse_args()
+
+    if args.profile:
+        sim.install()
+        import profiler
+        profiler.enable()
+
+    trace = Trace.load(args.trace)
+    if args.seconds is not None:
+        trace.seconds = args.seconds
+    p = simulate(trace, args.speed, args.frames, virtual=args.virtual)
+    print('Frames: {:d}, SPI bytes: {:d}, RAM bytes: {:d}, busy: {:d} ms'.format(
+        len(p.frames), p.bytes_sent, p.ram_bytes, p.busy_ms))
+    if args.profile:
+        import profiler
+        profiler.dump()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+# BSD 3-Clause License
+# Copyright (c) 2022, Thomas Breitbach https://github.com/TomBric
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
+
+
+State bus shared by the tasks of the trim indicator.
+The producers (sensor reader, button callbacks) change the values of a State and call publish(), the consumers
+subscribe an Event and sleep until the next publish instead of polling the values.
+"""
+
+import uasyncio
+
+
+class State:
+    def __init__(self):
+        self.trim = 0            # raw elevator trim value, -100 .. 100
+        self.rudder = 0          # raw rudder trim value, -100 .. 100
+        self.power = 0.0         # power voltage of aircraft
+        self.status = 0          # user status, 0 normal, 1 first long press, 2 setup elevator, 5 setup rudder
+        self.setup_point = 0     # index of the calibration point to be set next in setup
+        self.wakeup = 0          # number of forced refreshs requested
+        self.sample = 0          # sequence number of the acquisition of trim and rudder, for the latency trace
+        self.sample_us = 0       # ticks_us of this acquisition
+        self.seq = 0             # incremented with every publish
+        self.events = []
+
+    def subscribe(self):   # returns an Event which is set with every publish
+        ev = uasyncio.Event()
+        self.events.append(ev)
+        return ev
+
+    def publish(self):   # call after changing values, wakes up all subscribers
+        self.seq += 1
+        for ev in self.events:
+            ev.set()
+
+
+async def wait(ev, timeout_ms=None):   # waits for the next publish, returns False if timeout_ms passed before
+    if timeout_ms is None:
+        await ev.wait()
+    else:
+        try:
+            await uasyncio.wait_for_ms(ev.wait(), timeout_ms)
+        except uasyncio.TimeoutError:
+            return False
+    ev.clear()
+    return True